@@ -4,6 +4,10 @@ File processing service to read content from various file types
 import os
 import json
 import csv
+import codecs
+import logging
+import shutil
+import tempfile
 from pathlib import Path
 from typing import Dict, List
 import os
@@ -11,6 +15,8 @@ import io
 import base64
 import requests
 
+logger = logging.getLogger(__name__)
+
 # Optional imports for different file types
 try:
     import PyPDF2
@@ -91,6 +97,9 @@ class FileProcessor:
         '.lua', '.scala', '.clj', '.hs', '.elm', '.ex', '.exs', '.erl', '.ml', '.fs',
         '.cs', '.vb', '.asm', '.s', '.asmx', '.vue', '.svelte', '.tsx', '.jsx'
     }
+    
+    # Tried in order when decoding text files; utf-8 first, then single-byte fallbacks
+    TEXT_ENCODINGS = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
 
     @staticmethod
     def _call_nvidia_ocr(image_bytes: bytes) -> str:
@@ -293,9 +302,7 @@ class FileProcessor:
     @staticmethod
     def _read_text_file(file_path: str) -> str:
         """Read text file with encoding detection"""
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        
-        for encoding in encodings:
+        for encoding in FileProcessor.TEXT_ENCODINGS:
             try:
                 with open(file_path, 'r', encoding=encoding) as f:
                     return f.read()
@@ -306,6 +313,21 @@ class FileProcessor:
         with open(file_path, 'rb') as f:
             return f.read().decode('utf-8', errors='replace')
     
+    @staticmethod
+    def decode_text(raw: bytes, final: bool = True) -> str:
+        """
+        Decode text bytes, trying utf-8 before the single-byte fallbacks
+        Pass final=False for a capped prefix so a multi-byte character cut at the end doesn't push it off utf-8
+        """
+        for encoding in FileProcessor.TEXT_ENCODINGS:
+            try:
+                return codecs.getincrementaldecoder(encoding)().decode(raw, final=final)
+            except UnicodeDecodeError:
+                continue
+        
+        # If all encodings fail, decode with errors='replace'
+        return raw.decode('utf-8', errors='replace')
+    
     @staticmethod
     def _read_pdf(file_path: str) -> str:
         """Extract text from PDF file"""
@@ -459,9 +481,6 @@ class FileProcessor:
             return None
         
         try:
-            import tempfile
-            import shutil
-            
             # Create temporary directory for PDF
             temp_dir = tempfile.mkdtemp()
             pdf_path = os.path.join(temp_dir, "temp_doc.pdf")
@@ -530,8 +549,6 @@ class FileProcessor:
                     pass
         except Exception as e:
             # Log error for debugging but return None silently
-            import logging
-            logger = logging.getLogger(__name__)
             logger.debug(f"OCR for DOC file failed: {e}")
             return None
         return None
@@ -3,10 +3,13 @@ GitHub repository file fetching service
 Fetches all files from a public GitHub repository recursively
 """
 import os
+import time
+import asyncio
+import httpx
 import requests
 import base64
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +38,29 @@ class GitHubService:
     def __init__(self):
         self.github_token = os.getenv('GITHUB_TOKEN', '')
         self.base_url = 'https://api.github.com'
+        # Fetched file lists keyed by (owner/repo, head commit sha); entries expire after cache_ttl seconds
+        self.cache_ttl = float(os.getenv('GIT_CACHE_TTL', '600'))
+        # (owner/repo, sha) -> (stored at, files, entry limit the files were fetched under; None = whole repo)
+        self._repo_cache: Dict[Tuple[str, str], Tuple[float, List[Dict], Optional[int]]] = {}
+        # Max concurrent blob downloads per repository in afetch_repository_files
+        self.fetch_concurrency = int(os.getenv('GIT_FETCH_CONCURRENCY', '20'))
+        # Shared async client; created lazily because no event loop exists at import time
+        self._async_client: Optional[httpx.AsyncClient] = None
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                headers=self._get_headers(),
+                timeout=30,
+                limits=httpx.Limits(max_connections=self.fetch_concurrency, max_keepalive_connections=self.fetch_concurrency),
+            )
+        return self._async_client
+    
+    async def aclose(self) -> None:
+        """Close the shared async client (call on application shutdown)"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
     
     def _get_headers(self) -> Dict[str, str]:
         """Get request headers with optional token"""
@@ -68,8 +94,25 @@ class GitHubService:
             logger.error(f"Error parsing GitHub URL {url}: {e}")
         return None
     
-    def _fetch_file_content(self, owner: str, repo: str, path: str) -> Optional[str]:
-        """Fetch content of a single file from GitHub"""
+    def _get_head_commit(self, owner: str, repo: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (default_branch, head commit sha), or (None, None) if unavailable"""
+        try:
+            repo_response = requests.get(f"{self.base_url}/repos/{owner}/{repo}", headers=self._get_headers(), timeout=30)
+            if repo_response.status_code != 200:
+                return None, None
+            branch = repo_response.json().get('default_branch', 'main')
+            # The sha media type returns the bare commit id instead of the full commit JSON
+            headers = dict(self._get_headers(), Accept='application/vnd.github.sha')
+            sha_response = requests.get(f"{self.base_url}/repos/{owner}/{repo}/commits/{branch}", headers=headers, timeout=30)
+            if sha_response.status_code != 200:
+                return branch, None
+            return branch, sha_response.text.strip()
+        except Exception as e:
+            logger.error(f"Error fetching head commit for {owner}/{repo}: {e}")
+            return None, None
+    
+    def _fetch_file_content(self, owner: str, repo: str, path: str, failed: Optional[List[str]] = None) -> Optional[str]:
+        """Fetch content of a single file from GitHub; paths that could not be downloaded are appended to failed"""
         try:
             url = f"{self.base_url}/repos/{owner}/{repo}/contents/{path}"
             response = requests.get(url, headers=self._get_headers(), timeout=30)
@@ -79,16 +122,19 @@ class GitHubService:
                 if data.get('type') == 'file' and data.get('encoding') == 'base64':
                     content = base64.b64decode(data['content']).decode('utf-8', errors='replace')
                     return content
+                return None
             elif response.status_code == 404:
                 logger.warning(f"File not found: {path}")
             else:
                 logger.warning(f"Failed to fetch {path}: {response.status_code}")
         except Exception as e:
             logger.error(f"Error fetching file {path}: {e}")
+        if failed is not None:
+            failed.append(path)
         return None
     
-    def _fetch_tree_recursive(self, owner: str, repo: str, path: str = '', branch: str = 'main') -> List[Dict]:
-        """Recursively fetch all files from GitHub repository"""
+    def _fetch_tree_recursive(self, owner: str, repo: str, path: str = '', branch: str = 'main', failed: Optional[List[str]] = None) -> List[Dict]:
+        """Recursively fetch all files from GitHub repository; directories and files that failed are appended to failed"""
         files = []
         
         try:
@@ -106,6 +152,8 @@ class GitHubService:
             
             if response.status_code != 200:
                 logger.warning(f"Failed to fetch contents from {path}: {response.status_code}")
+                if failed is not None:
+                    failed.append(path)
                 return files
             
             items = response.json()
@@ -123,7 +171,7 @@ class GitHubService:
                 
                 # If it's a directory, recurse
                 if item_type == 'dir':
-                    sub_files = self._fetch_tree_recursive(owner, repo, item_path, branch)
+                    sub_files = self._fetch_tree_recursive(owner, repo, item_path, branch, failed)
                     files.extend(sub_files)
                 
                 # If it's a file, check if we want to include it
@@ -131,7 +179,7 @@ class GitHubService:
                     file_ext = Path(item_name).suffix.lower()
                     # Include code files and text files
                     if file_ext in self.CODE_EXTENSIONS or not file_ext:
-                        file_content = self._fetch_file_content(owner, repo, item_path)
+                        file_content = self._fetch_file_content(owner, repo, item_path, failed)
                         if file_content is not None:
                             files.append({
                                 'path': item_path,
@@ -143,30 +191,183 @@ class GitHubService:
         
         except Exception as e:
             logger.error(f"Error fetching tree from {path}: {e}")
+            if failed is not None:
+                failed.append(path)
         
         return files
     
-    def fetch_repository_files(self, github_url: str, max_files: int = 100) -> List[Dict]:
+    def _get_cached(self, cache_key: Tuple[str, str], max_files: int) -> Optional[List[Dict]]:
+        """Cached files (up to max_files), unless expired or fetched under a smaller limit"""
+        cached = self._repo_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            _, files, limit = cached
+            if limit is None or limit >= max_files:
+                return files[:max_files]
+        return None
+    
+    def _store_cached(self, cache_key: Tuple[str, str], files: List[Dict], limit: Optional[int] = None) -> None:
+        now = time.monotonic()
+        # Drop expired entries so the cache does not grow without bound
+        for key in [k for k, (ts, _, _) in self._repo_cache.items() if now - ts >= self.cache_ttl]:
+            del self._repo_cache[key]
+        self._repo_cache[cache_key] = (now, files, limit)
+    
+    def _wanted_tree_entry(self, item: Dict) -> bool:
+        """Apply the same directory/extension filters as _fetch_tree_recursive to a git tree entry"""
+        if item.get('type') != 'blob':
+            return False
+        path = Path(item.get('path', ''))
+        if any(part.lower() in self.SKIP_DIRS for part in path.parts[:-1]):
+            return False
+        file_ext = path.suffix.lower()
+        return file_ext in self.CODE_EXTENSIONS or not file_ext
+    
+    async def _aget_head_commit(self, client: httpx.AsyncClient, owner: str, repo: str) -> Tuple[Optional[str], Optional[str]]:
+        """Async variant of _get_head_commit"""
+        try:
+            repo_response = await client.get(f"{self.base_url}/repos/{owner}/{repo}")
+            if repo_response.status_code != 200:
+                return None, None
+            branch = repo_response.json().get('default_branch', 'main')
+            sha_response = await client.get(
+                f"{self.base_url}/repos/{owner}/{repo}/commits/{branch}",
+                headers={'Accept': 'application/vnd.github.sha'},
+            )
+            if sha_response.status_code != 200:
+                return branch, None
+            return branch, sha_response.text.strip()
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching head commit for {owner}/{repo}: {e}")
+            return None, None
+    
+    async def _afetch_blob(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, owner: str, repo: str, item: Dict, failed: List[str]) -> Optional[Dict]:
+        """Download one blob from the git data API and return it as a file dict; paths that could not be downloaded are appended to failed"""
+        path = item['path']
+        try:
+            async with semaphore:
+                response = await client.get(f"{self.base_url}/repos/{owner}/{repo}/git/blobs/{item['sha']}")
+            if response.status_code != 200:
+                logger.warning(f"Failed to fetch {path}: {response.status_code}")
+                failed.append(path)
+                return None
+            data = response.json()
+            if data.get('encoding') != 'base64':
+                return None
+            content = base64.b64decode(data['content']).decode('utf-8', errors='replace')
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching file {path}: {e}")
+            failed.append(path)
+            return None
+        logger.info(f"Fetched file: {path}")
+        return {
+            'path': path,
+            'name': Path(path).name,
+            'content': content,
+            'size': item.get('size', 0)
+        }
+    
+    async def afetch_repository_files(self, github_url: str, max_files: int = 100, owner_repo: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        Async variant of fetch_repository_files
+        
+        Lists the whole repository with a single recursive git/trees call, filters it locally,
+        then downloads the blobs concurrently (at most fetch_concurrency at a time).
+        Shares the commit-keyed cache with fetch_repository_files.
+        """
+        parsed = owner_repo or self._parse_github_url(github_url)
+        if not parsed:
+            logger.error(f"Invalid GitHub URL: {github_url}")
+            return []
+        
+        owner, repo = parsed
+        client = self._get_async_client()
+        branch, sha = await self._aget_head_commit(client, owner, repo)
+        cache_key = (f"{owner}/{repo}".lower(), sha)
+        if sha:
+            cached = self._get_cached(cache_key, max_files)
+            if cached is not None:
+                logger.info(f"Using cached files for {owner}/{repo}@{sha[:7]}")
+                return cached
+        
+        logger.info(f"Fetching files from {owner}/{repo}")
+        
+        try:
+            tree_response = await client.get(
+                f"{self.base_url}/repos/{owner}/{repo}/git/trees/{sha or branch or 'HEAD'}",
+                params={'recursive': '1'},
+            )
+            if tree_response.status_code != 200:
+                logger.warning(f"Failed to fetch tree for {owner}/{repo}: {tree_response.status_code}")
+                return []
+            tree = tree_response.json()
+            if tree.get('truncated'):
+                logger.warning(f"Tree listing for {owner}/{repo} was truncated by GitHub; some files are missing")
+            
+            entries = [item for item in tree.get('tree', []) if self._wanted_tree_entry(item)]
+            
+            # Limit number of files before downloading: every blob is one API call against the rate limit
+            limit = None
+            if len(entries) > max_files:
+                limit = max_files
+                logger.warning(f"Repository has {len(entries)} files, limiting to {max_files}")
+                entries = entries[:max_files]
+            
+            semaphore = asyncio.Semaphore(self.fetch_concurrency)
+            failed = []
+            results = await asyncio.gather(*(self._afetch_blob(client, semaphore, owner, repo, item, failed) for item in entries))
+            files = [f for f in results if f is not None]
+            
+            if failed:
+                # Don't cache an incomplete repository; the next call retries the download
+                logger.warning(f"{len(failed)} files from {owner}/{repo} could not be downloaded; not caching")
+            elif sha and files:
+                # Only what was fetched is cached; a later call with a larger limit fetches again
+                self._store_cached(cache_key, files, limit)
+            
+            logger.info(f"Successfully fetched {len(files)} files from {owner}/{repo}")
+            return files
+        
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching repository files: {e}")
+            return []
+    
+    def fetch_repository_files(self, github_url: str, max_files: int = 100, owner_repo: Optional[Tuple[str, str]] = None) -> List[Dict]:
         """
         Fetch all relevant files from a GitHub repository
         
         Args:
             github_url: GitHub repository URL
             max_files: Maximum number of files to fetch (default: 100)
+            owner_repo: Already-parsed (owner, repo) pair; skips re-parsing github_url
         
         Returns:
             List of file dictionaries with path, name, content, and size
         """
-        parsed = self._parse_github_url(github_url)
+        parsed = owner_repo or self._parse_github_url(github_url)
         if not parsed:
             logger.error(f"Invalid GitHub URL: {github_url}")
             return []
         
         owner, repo = parsed
+        branch, sha = self._get_head_commit(owner, repo)
+        cache_key = (f"{owner}/{repo}".lower(), sha)
+        if sha:
+            cached = self._get_cached(cache_key, max_files)
+            if cached is not None:
+                logger.info(f"Using cached files for {owner}/{repo}@{sha[:7]}")
+                return cached
+        
         logger.info(f"Fetching files from {owner}/{repo}")
         
         try:
-            files = self._fetch_tree_recursive(owner, repo)
+            failed = []
+            files = self._fetch_tree_recursive(owner, repo, branch=branch or 'main', failed=failed)
+            
+            if failed:
+                # Don't cache an incomplete repository; the next call retries the download
+                logger.warning(f"{len(failed)} paths from {owner}/{repo} could not be downloaded; not caching")
+            elif sha and files:
+                self._store_cached(cache_key, files)
             
             # Limit number of files
             if len(files) > max_files:
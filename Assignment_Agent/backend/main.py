@@ -1,12 +1,17 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterable, Union
 import json
 import re
 import os
 import uuid
+import hashlib
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -28,6 +33,72 @@ import logging
 logging.basicConfig(level=(os.getenv('APP_LOG_LEVEL','INFO')))
 logger = logging.getLogger(__name__)
 
+# QA extraction heuristics shared by the batch pipeline and the debug endpoint
+_QUESTION_RE = re.compile(r"^\s*(?:Question\b[:\s]*|Q\d*[:\s]*|Q\d+\b|\d+\s*[\.)\-:])", flags=re.IGNORECASE)
+_ANSWER_MARKER_RE = re.compile(r"\bAnswer\b[:\s]*", flags=re.IGNORECASE)
+_Q_STRIP_RE = re.compile(r"^\s*(?:Question\b[:\s]*|Q\d*[:\s]*|\d+\s*[\.)\-:]\s*)", flags=re.IGNORECASE)
+_GITHUB_URL_RE = re.compile(r"^https?://(?:www\.)?github\.com/(?P<owner>[\w.-]+)/(?P<repo>[\w.-]+?)(?:\.git)?(?:[/?#]|$)", flags=re.IGNORECASE)
+_HAS_QUESTIONS_RE = re.compile(r"\bQ(?:uestion)?\s*\d+\b|\bQ\d+\b|\bQuestion:\b|\bName:\b|\bStudent:\b|\bCandidate:\b|^\d+\.\s", flags=re.IGNORECASE | re.MULTILINE)
+
+
+def extract_qa_pairs(text_or_lines: Union[str, Iterable[str]]):
+    """
+    Extract simple question/answer pairs from extracted content in a single pass
+    Accepts the full text or an already-split iterable of lines (consumed once, never re-joined)
+    A question line opens a pair; following non-blank lines form its answer until the next question line
+    Returns (qa_pairs, has_questions); has_questions also covers markers like 'Name:' / 'Q1' that yield no pair
+    """
+    qa = []
+    if not text_or_lines:
+        return qa, False
+    lines = text_or_lines.splitlines() if isinstance(text_or_lines, str) else text_or_lines
+
+    cur_q = None
+    cur_ans = []
+    marker_seen = False
+    # Lines that produce no pair are checked for question-like markers until the first hit
+    found_marker = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if cur_q is not None:
+            if not _QUESTION_RE.search(line):
+                # If this is the first 'Answer:' marker line, strip the marker
+                if not marker_seen and _ANSWER_MARKER_RE.search(line):
+                    marker_seen = True
+                    line = _ANSWER_MARKER_RE.sub('', line).strip()
+                    if not line:
+                        continue
+                cur_ans.append(line)
+                continue
+            # Next question reached: flush the current pair and classify this line below
+            qa.append({'question': cur_q, 'answer': ' '.join(cur_ans).strip() or None})
+            cur_q = None
+
+        # Table-like row with tabs
+        if '\t' in line:
+            cells = [c.strip() for c in line.split('\t')]
+            lc = [c.lower() for c in cells]
+            # try to find 'question' and 'answer' cells
+            if any('question' in c for c in lc) or any('answer' in c for c in lc) or any('q' == c for c in lc):
+                # naive mapping: question = first cell, answer = second cell
+                qa.append({'question': cells[0], 'answer': cells[1] if len(cells) > 1 else ''})
+                continue
+        # line contains explicit Question keyword or numbered question
+        if _QUESTION_RE.search(line) or '?' in line:
+            cur_q = _Q_STRIP_RE.sub('', line).strip() or line
+            cur_ans = []
+            marker_seen = False
+        elif not found_marker and not qa and _HAS_QUESTIONS_RE.search(line):
+            found_marker = True
+
+    if cur_q is not None:
+        qa.append({'question': cur_q, 'answer': ' '.join(cur_ans).strip() or None})
+    return qa, bool(qa) or found_marker
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
@@ -35,6 +106,9 @@ Base.metadata.create_all(bind=engine)
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Upper bound on text read and returned by /debug/extracted
+DEBUG_MAX_BYTES = int(os.getenv("DEBUG_MAX_BYTES", "2000000"))
+
 # Initialize services
 file_processor = FileProcessor()
 openrouter_service = OpenRouterService()
@@ -43,7 +117,67 @@ git_evaluator = GitEvaluator(openrouter_service)
 ppt_evaluator = PPTEvaluator(openrouter_service)
 ppt_design_evaluator = PPTDesignEvaluator(openrouter_service)
 
-app = FastAPI(title="Login API", version="1.0.0")
+# Bound concurrent LLM calls across requests to stay under OpenRouter rate limits
+llm_semaphore = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "8")))
+
+
+async def generate_limited(prompt: str) -> dict:
+    async with llm_semaphore:
+        return await openrouter_service.agenerate(prompt)
+
+
+def _cleanup_paths(paths) -> None:
+    """Delete temporary upload/metadata files, ignoring ones that are already gone"""
+    for path in paths:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+# Tasks for git evaluate/grade pipelines currently running, keyed by request identity
+_inflight_git: Dict[tuple, asyncio.Task] = {}
+
+
+async def run_coalesced(key: tuple, run):
+    """Await run() once per key; callers arriving while it is in flight get the same result"""
+    task = _inflight_git.get(key)
+    if task is None:
+        # The pipeline runs in its own task rather than the first caller's, so no single caller owns it
+        task = asyncio.ensure_future(run())
+        _inflight_git[key] = task
+
+        def _finished(done: asyncio.Task) -> None:
+            if _inflight_git.get(key) is done:
+                del _inflight_git[key]
+            if not done.cancelled():
+                done.exception()  # mark retrieved in case every caller went away before it finished
+
+        task.add_done_callback(_finished)
+    else:
+        logger.info(f"Joining in-flight request for {key}")
+    # shield: a caller disconnecting must not cancel the pipeline the other callers are waiting on
+    return await asyncio.shield(task)
+
+
+# Per-repository locks so concurrent requests for the same repo share one GitHub download (and its cache entry);
+# weak values: an entry lives only while some request holds or awaits its lock, so keys don't accumulate
+_repo_fetch_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+async def fetch_repository_files_shared(github_url: str, max_files: int, owner_repo: Optional[tuple] = None) -> list:
+    if owner_repo is None:
+        # Parse here too so every caller (e.g. /generate) locks on the same owner/repo key as the git endpoints
+        url_match = _GITHUB_URL_RE.match(github_url.strip())
+        if url_match:
+            owner_repo = url_match.group('owner', 'repo')
+    key = f"{owner_repo[0]}/{owner_repo[1]}".lower() if owner_repo else github_url.strip().rstrip('/').lower()
+    lock = _repo_fetch_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        return await github_service.afetch_repository_files(github_url, max_files, owner_repo)
+
+# orjson serializes the large extracted-text and grading payloads much faster than the stdlib encoder
+app = FastAPI(title="Login API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -54,6 +188,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def configure_thread_pool():
+    # asyncio.to_thread uses the loop's default executor; size it for the blocking evaluator/extractor calls
+    workers = int(os.getenv("BLOCKING_WORKERS", "16"))
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await openrouter_service.aclose()
+    await github_service.aclose()
+
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -245,8 +392,8 @@ async def upload_files(
             try:
                 meta_path = UPLOAD_DIR / f"{file_id}.meta.json"
                 with open(meta_path, "w", encoding="utf-8") as m:
-                    json.dump({"original_filename": file.filename}, m)
-            except Exception:
+                    json.dump({"original_filename": file.filename, "ext": file_extension}, m)
+            except OSError:
                 pass
             
             file_ids.append(file_id)
@@ -265,23 +412,18 @@ async def upload_files(
     
     except HTTPException:
         # Clean up on error
-        for file_id, file_info in saved_files.items():
-            file_path = Path(file_info["path"])
-            if file_path.exists():
-                file_path.unlink()
+        _cleanup_paths(Path(file_info["path"]) for file_info in saved_files.values())
         raise
     except Exception as e:
         # Clean up on error
-        for file_id, file_info in saved_files.items():
-            file_path = Path(file_info["path"])
-            if file_path.exists():
-                file_path.unlink()
+        _cleanup_paths(Path(file_info["path"]) for file_info in saved_files.values())
         raise HTTPException(status_code=500, detail=f"Error uploading files: {str(e)}")
 
 
 @app.post("/generate", response_model=GenerateResponse)
 async def generate_content(
     request: GenerateRequest,
+    background: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -317,7 +459,7 @@ async def generate_content(
         if github_url:
             logger.info(f"Fetching files from GitHub repository: {github_url}")
             try:
-                github_files = github_service.fetch_repository_files(github_url, max_files=100)
+                github_files = await fetch_repository_files_shared(github_url, max_files=100)
                 logger.info(f"Fetched {len(github_files)} files from GitHub")
                 
                 # Process each GitHub file
@@ -384,7 +526,7 @@ async def generate_content(
                         if isinstance(md, dict):
                             original_filename = md.get("original_filename") or original_filename
                 meta_paths_to_cleanup.append(meta_path)
-            except Exception:
+            except (OSError, ValueError):
                 pass
 
             # Read file content - wrap in try/except to ensure processing continues even if one file fails
@@ -448,12 +590,9 @@ async def generate_content(
 
             file_contents.append(file_data)
             file_paths_to_cleanup.append(file_path)
-            try:
-                # Prefer original filename from metadata; fall back to processor or saved name
-                original_name = original_filename or file_data.get("filename") or file_path.name
-                file_basenames.append(Path(original_name).stem)
-            except Exception:
-                file_basenames.append(Path(file_path.name).stem)
+            # Prefer original filename from metadata; fall back to processor or saved name
+            original_name = original_filename or file_data.get("filename") or file_path.name
+            file_basenames.append(Path(original_name).stem)
         
         # Check if all files are PPT files - if so, use PPT evaluator
         all_ppt_files = all(
@@ -469,8 +608,85 @@ async def generate_content(
             if evaluate_design:
                 # Evaluate BOTH content and visual design when checkbox is checked
                 logger.info(f"Detected {len(file_contents)} PPT file(s), evaluating both content and visual design")
+                # Bounds concurrent LLM calls across all files (each file makes up to two)
+                eval_semaphore = asyncio.Semaphore(ppt_evaluator.max_concurrency)
+
+                async def limited(coro):
+                    async with eval_semaphore:
+                        return await coro
+
+                async def evaluate_combined(slot: int, filename: str, ppt_result: dict, design_description: str, total_slides: int) -> str:
+                    try:
+                        await ppt_evaluator.stagger(slot)
+                        content_ok = ppt_result.get('slides_text') and not ppt_result.get('slides_text', '').strip().startswith('[')
+                        design_ok = design_description and not design_description.strip().startswith('[')
+                        # Content and design evaluations are independent; run them concurrently
+                        content_result, design_result = await asyncio.gather(
+                            limited(ppt_evaluator.aevaluate_ppt(request.title, request.description, ppt_result)) if content_ok else asyncio.sleep(0),
+                            limited(ppt_design_evaluator.aevaluate_design_from_metadata(design_description, filename, total_slides)) if design_ok else asyncio.sleep(0),
+                        )
+                        
+                        # Initialize result parts
+                        result_parts = []
+                        result_parts.append(f"File: {filename}")
+                        result_parts.append(f"Total Slides: {total_slides}")
+                        result_parts.append("")
+                        result_parts.append("=" * 60)
+                        result_parts.append("CONTENT EVALUATION")
+                        result_parts.append("=" * 60)
+                        result_parts.append("")
+                        
+                        # Evaluate content
+                        content_error = False
+                        if not content_ok:
+                            error_msg = ppt_result.get('slides_text', 'Could not extract text content').strip('[]')
+                            result_parts.append(f"Error: {error_msg}")
+                            content_error = True
+                        elif 'error' in content_result:
+                            result_parts.append(f"Error: {content_result.get('error')}")
+                            content_error = True
+                        else:
+                            result_parts.append(ppt_evaluator.format_evaluation_result(content_result))
+                        
+                        # Add design evaluation section
+                        result_parts.append("")
+                        result_parts.append("=" * 60)
+                        result_parts.append("VISUAL DESIGN EVALUATION")
+                        result_parts.append("=" * 60)
+                        result_parts.append("")
+                        
+                        # Evaluate design
+                        design_error = False
+                        if not design_ok:
+                            error_msg = design_description.strip('[]') if design_description.strip().startswith('[') else "Could not extract design metadata"
+                            result_parts.append(f"Error: {error_msg}")
+                            design_error = True
+                        elif 'error' in design_result:
+                            result_parts.append(f"Error: {design_result.get('error')}")
+                            design_error = True
+                        else:
+                            result_parts.append(ppt_design_evaluator.format_design_evaluation_result(design_result))
+                        
+                        # Add overall summary if both evaluations succeeded
+                        if not content_error and not design_error:
+                            result_parts.append("")
+                            result_parts.append("=" * 60)
+                            result_parts.append("OVERALL SUMMARY")
+                            result_parts.append("=" * 60)
+                            result_parts.append("")
+                            result_parts.append("This presentation has been evaluated for both content quality and visual design.")
+                            result_parts.append("Review the sections above for detailed feedback on each aspect.")
+                        
+                        return "\n".join(result_parts)
+                    
+                    except Exception as e:
+                        logger.error(f"Exception during combined evaluation for {filename}: {e}", exc_info=True)
+                        return f"Error for {filename}: Exception during evaluation - {str(e)}"
+
                 try:
+                    # Entries are result strings, or indices into combined_jobs for files still being evaluated
                     formatted_results = []
+                    combined_jobs = []
                     file_idx = 0
                     for file_id in request.file_ids:
                         # Find the file path and original filename
@@ -485,7 +701,7 @@ async def generate_content(
                                     md = json.load(m)
                                     if isinstance(md, dict):
                                         original_filename = md.get("original_filename")
-                        except Exception:
+                        except (OSError, ValueError):
                             pass
                         
                         # Find the actual file
@@ -501,82 +717,15 @@ async def generate_content(
                             logger.info(f"Processing PPT file for combined evaluation: {file_path} (original: {filename})")
                             
                             try:
-                                # Step 1: Extract text content for content evaluation
-                                ppt_result = PPTProcessor.process_ppt_file(str(file_path))
+                                # Steps 1-2: Extract text content and design metadata (one pass over the slides for PPTX)
+                                ppt_result, design_metadata = PPTProcessor.extract_all(str(file_path))
                                 ppt_result['filename'] = filename
-                                
-                                # Step 2: Extract design metadata for design evaluation
-                                design_metadata = PPTProcessor.extract_design_metadata(str(file_path))
                                 design_description = design_metadata.get('design_description', '')
                                 total_slides = design_metadata.get('total_slides', 0) or ppt_result.get('total_slides', 0)
                                 
-                                # Initialize result parts
-                                result_parts = []
-                                result_parts.append(f"File: {filename}")
-                                result_parts.append(f"Total Slides: {total_slides}")
-                                result_parts.append("")
-                                result_parts.append("=" * 60)
-                                result_parts.append("CONTENT EVALUATION")
-                                result_parts.append("=" * 60)
-                                result_parts.append("")
-                                
-                                # Evaluate content
-                                content_error = False
-                                if not ppt_result.get('slides_text') or ppt_result.get('slides_text', '').strip().startswith('['):
-                                    error_msg = ppt_result.get('slides_text', 'Could not extract text content').strip('[]')
-                                    result_parts.append(f"Error: {error_msg}")
-                                    content_error = True
-                                else:
-                                    content_result = ppt_evaluator.evaluate_ppt(
-                                        request.title,
-                                        request.description,
-                                        ppt_result
-                                    )
-                                    
-                                    if 'error' in content_result:
-                                        result_parts.append(f"Error: {content_result.get('error')}")
-                                        content_error = True
-                                    else:
-                                        result_parts.append(ppt_evaluator.format_evaluation_result(content_result))
-                                
-                                # Add design evaluation section
-                                result_parts.append("")
-                                result_parts.append("=" * 60)
-                                result_parts.append("VISUAL DESIGN EVALUATION")
-                                result_parts.append("=" * 60)
-                                result_parts.append("")
-                                
-                                # Evaluate design
-                                design_error = False
-                                design_result = None
-                                if not design_description or design_description.strip().startswith('['):
-                                    error_msg = design_description.strip('[]') if design_description.strip().startswith('[') else "Could not extract design metadata"
-                                    result_parts.append(f"Error: {error_msg}")
-                                    design_error = True
-                                else:
-                                    design_result = ppt_design_evaluator.evaluate_design_from_metadata(
-                                        design_description,
-                                        filename,
-                                        total_slides
-                                    )
-                                    
-                                    if 'error' in design_result:
-                                        result_parts.append(f"Error: {design_result.get('error')}")
-                                        design_error = True
-                                    else:
-                                        result_parts.append(ppt_design_evaluator.format_design_evaluation_result(design_result))
-                                
-                                # Add overall summary if both evaluations succeeded
-                                if not content_error and not design_error:
-                                    result_parts.append("")
-                                    result_parts.append("=" * 60)
-                                    result_parts.append("OVERALL SUMMARY")
-                                    result_parts.append("=" * 60)
-                                    result_parts.append("")
-                                    result_parts.append("This presentation has been evaluated for both content quality and visual design.")
-                                    result_parts.append("Review the sections above for detailed feedback on each aspect.")
-                                
-                                formatted_results.append("\n".join(result_parts))
+                                # Step 3: queue the LLM evaluations; all files are evaluated concurrently below
+                                formatted_results.append(len(combined_jobs))
+                                combined_jobs.append(evaluate_combined(len(combined_jobs), filename, ppt_result, design_description, total_slides))
                                 
                             except Exception as e:
                                 logger.error(f"Exception during combined evaluation for {filename}: {e}", exc_info=True)
@@ -591,7 +740,7 @@ async def generate_content(
                                         md = json.load(m)
                                         if isinstance(md, dict):
                                             original_filename = md.get("original_filename")
-                            except Exception:
+                            except (OSError, ValueError):
                                 pass
                             
                             filename = original_filename or (file_contents[file_idx].get('filename', 'Unknown') if file_idx < len(file_contents) else 'Unknown')
@@ -599,7 +748,10 @@ async def generate_content(
                         
                         file_idx += 1
                     
-                    result_text = "\n\n".join(formatted_results)
+                    combined_texts = await asyncio.gather(*combined_jobs)
+                    result_text = "\n\n".join(
+                        combined_texts[entry] if isinstance(entry, int) else entry for entry in formatted_results
+                    )
                     
                 except Exception as e:
                     logger.error(f"Error in combined PPT evaluation: {e}", exc_info=True)
@@ -623,7 +775,7 @@ async def generate_content(
                                     md = json.load(m)
                                     if isinstance(md, dict):
                                         original_filename = md.get("original_filename")
-                        except Exception:
+                        except (OSError, ValueError):
                             pass
                         
                         # Find the actual file
@@ -652,7 +804,7 @@ async def generate_content(
                         file_idx += 1
                     
                     # Evaluate PPT files
-                    evaluation_result = ppt_evaluator.evaluate_multiple_ppts(
+                    evaluation_result = await ppt_evaluator.aevaluate_multiple_ppts(
                         request.title,
                         request.description,
                         ppt_files_data
@@ -672,20 +824,9 @@ async def generate_content(
                     logger.error(f"Error in PPT content evaluation: {e}", exc_info=True)
                     result_text = f"Error during content evaluation: {str(e)}"
             
-            # Clean up files (for both design and content evaluation)
+            # Clean up files (for both design and content evaluation) after the response is sent
             try:
-                for file_path in file_paths_to_cleanup:
-                    try:
-                        if file_path.exists():
-                            file_path.unlink()
-                    except Exception:
-                        pass
-                for meta_path in meta_paths_to_cleanup:
-                    try:
-                        if meta_path.exists():
-                            meta_path.unlink()
-                    except Exception:
-                        pass
+                background.add_task(_cleanup_paths, file_paths_to_cleanup + meta_paths_to_cleanup)
                 
                 return {
                     "success": True,
@@ -699,39 +840,10 @@ async def generate_content(
                 # Fall through to regular processing if PPT evaluation fails
                 pass
         
-        # Helper: detect if extracted content contains question-like patterns
-        def detect_question_like(text: str) -> bool:
-            if not text or not isinstance(text, str):
-                return False
-            patterns = [
-                r"\bQ(?:uestion)?\s*\d+\b",
-                r"\bQ\d+\b",
-                r"\bQuestion:\b",
-                r"\bName:\b",
-                r"\bStudent:\b",
-                r"\bCandidate:\b",
-                r"^\d+\.\s",
-            ]
-            for p in patterns:
-                try:
-                    if re.search(p, text, flags=re.IGNORECASE | re.MULTILINE):
-                        return True
-                except Exception:
-                    continue
-            return False
-
         # Build batched prompts to ensure all files are processed
         def build_prompt(intro_title: str, intro_desc: str, files_subset):
             # Compute base names for explicit naming
-            subset_names = []
-            try:
-                for _fd in files_subset:
-                    try:
-                        subset_names.append(_fd.get('display_name') or Path(_fd.get('filename', '')).stem or 'Unnamed')
-                    except Exception:
-                        subset_names.append('Unnamed')
-            except Exception:
-                subset_names = []
+            subset_names = [_fd.get('display_name') or Path(_fd.get('filename', '')).stem or 'Unnamed' for _fd in files_subset]
             parts = [
                 f"Title: {intro_title}\n",
                 f"Task Description (General Instructions Only):\n{intro_desc}\n\n",
@@ -770,110 +882,35 @@ async def generate_content(
 
             ]
             for fd in files_subset:
+                is_err = fd.get('is_error', False)
+                has_q = fd.get('has_questions', True)
+                qa = fd.get('qa_pairs') or []
                 parts.append(f"--- File: {fd['filename']} ({fd['file_type']}) ---\n")
                 
                 # If this is an error message, tell the model explicitly
-                if fd.get('is_error', False):
+                if is_err:
                     parts.append("[WARNING: This file could not be processed. The content below is an error message, not actual file content. Return score_percent: 0.00 and reasoning explaining that the file could not be read.]\n")
                 
                 # If the extractor did not detect questions, include an explicit hint for the model
-                if not fd.get('has_questions', True) and not fd.get('is_error', False):
+                elif not has_q:
                     parts.append("[NOTE: This file may contain questions/answers in tables, headers, or non-standard formats — search thoroughly.]\n")
 
                 # If we extracted QA pairs, include them explicitly to help the model
-                try:
-                    qa = fd.get('qa_pairs') or []
-                    if qa:
-                        parts.append("EXTRACTED_QUESTION_ANSWER_PAIRS:\n")
-                        for p in qa:
-                            qtxt = p.get('question') or ''
-                            atxt = p.get('answer') or '[NO ANSWER EXTRACTED]'
-                            parts.append(f"Q: {qtxt}\nA: {atxt}\n\n")
-                except Exception:
-                    pass
+                if qa:
+                    parts.append("EXTRACTED_QUESTION_ANSWER_PAIRS:\n")
+                    for p in qa:
+                        qtxt = p.get('question') or ''
+                        atxt = p.get('answer') or '[NO ANSWER EXTRACTED]'
+                        parts.append(f"Q: {qtxt}\nA: {atxt}\n\n")
 
                 parts.append(fd['content_processed'])
                 parts.append("\n\n")
             return "".join(parts)
 
-        # Log prepared file summaries (length and whether they appear to contain questions)
-        try:
-            for fd in prepared:
-                content_snippet = (fd.get('content', '') or '')[:200].replace('\n', ' ')
-                logger.debug(f"Prepared file='{fd.get('filename')}' type={fd.get('file_type')} len={len(fd.get('content',''))} has_questions={fd.get('has_questions')} snippet='{content_snippet}'")
-        except Exception:
-            pass
-
         # Limits (reuse existing env names for compatibility)
         per_file_limit = int(os.getenv("OLLAMA_PER_FILE_CHAR_LIMIT", "20000"))
         total_limit = int(os.getenv("OLLAMA_TOTAL_CHAR_LIMIT", "60000"))
 
-        # Helper: extract simple QA pairs from extracted content
-        def extract_qa_pairs(text: str):
-            qa = []
-            if not text or not isinstance(text, str):
-                return qa
-            lines = [l.rstrip() for l in text.splitlines()]
-            i = 0
-            question_re = re.compile(r"^\s*(?:Question\b[:\s]*|Q\d*[:\s]*|Q\d+\b|\d+\s*[\.)\-:])", flags=re.IGNORECASE)
-            answer_marker_re = re.compile(r"\bAnswer\b[:\s]*", flags=re.IGNORECASE)
-
-            while i < len(lines):
-                line = lines[i].strip()
-                if not line:
-                    i += 1
-                    continue
-                # Table-like row with tabs
-                if '\t' in line:
-                    cells = [c.strip() for c in line.split('\t')]
-                    lc = [c.lower() for c in cells]
-                    # try to find 'question' and 'answer' cells
-                    if any('question' in c for c in lc) or any('answer' in c for c in lc) or any('q' == c for c in lc):
-                        # naive mapping: question = first cell, answer = last cell
-                        q = cells[0]
-                        a = cells[1] if len(cells) > 1 else ''
-                        qa.append({'question': q, 'answer': a})
-                        i += 1
-                        continue
-                # line contains explicit Question keyword or numbered question
-                if question_re.search(line) or '?' in line:
-                    # extract question text
-                    qtext = re.sub(r"^\s*(?:Question\b[:\s]*|Q\d*[:\s]*|\d+\s*[\.)\-:]\s*)", '', line, flags=re.IGNORECASE)
-                    # collect following lines as answer until next question or blank separator
-                    ans_lines = []
-                    j = i + 1
-                    while j < len(lines):
-                        l = lines[j].strip()
-                        if not l:
-                            # allow short blank separators
-                            j += 1
-                            # but break if next non-empty line looks like a question
-                            if j < len(lines) and question_re.search(lines[j]):
-                                break
-                            continue
-                        if question_re.search(l):
-                            break
-                        # If this line has 'Answer:' marker, strip it and include
-                        if answer_marker_re.search(l):
-                            a = answer_marker_re.sub('', l).strip()
-                            if a:
-                                ans_lines.append(a)
-                            j += 1
-                            # collect subsequent non-question lines
-                            while j < len(lines) and not question_re.search(lines[j]):
-                                if lines[j].strip():
-                                    ans_lines.append(lines[j].strip())
-                                j += 1
-                            break
-                        ans_lines.append(l)
-                        j += 1
-                    answer = ' '.join(ans_lines).strip()
-                    qa.append({'question': qtext.strip() or line, 'answer': answer or None})
-                    i = j
-                    continue
-                i += 1
-            return qa
-
         # Preprocess content with per-file truncation and QA extraction
         prepared = []
         error_message_indicators = [
@@ -893,6 +930,7 @@ async def generate_content(
         
         for idx, fd in enumerate(file_contents):
             content = fd.get('content', '')
+            filename = fd.get('filename', '')
             if not isinstance(content, str):
                 content = str(content)
             
@@ -902,121 +940,156 @@ async def generate_content(
             if not content.strip() or is_error_message:
                 # If it's an error message or empty, mark it as such
                 if is_error_message:
-                    content = f"[ERROR: Could not extract content from {fd.get('filename', 'file')}. The file may be corrupted, password-protected, or in an unsupported format.]"
+                    content = f"[ERROR: Could not extract content from {filename or 'file'}. The file may be corrupted, password-protected, or in an unsupported format.]"
                 else:
                     content = "[No extractable text from file]"
             
-            truncated_note = ""
             if len(content) > per_file_limit:
                 overflow = len(content) - per_file_limit
                 content = content[:per_file_limit]
-                truncated_note = f"\n[TRUNCATED {overflow} chars due to per-file limit]"
+                content_processed = content + f"\n[TRUNCATED {overflow} chars due to per-file limit]"
+            else:
+                # Common case: reuse the original string instead of building a copy
+                content_processed = content
             fd_copy = dict(fd)
-            fd_copy['content_processed'] = f"{content}{truncated_note}"
+            fd_copy['content_processed'] = content_processed
             fd_copy['is_error'] = is_error_message
             # Carry a stable display name aligned with original filenames
-            try:
-                if idx < len(file_basenames):
-                    fd_copy['display_name'] = file_basenames[idx]
-                else:
-                    fd_copy['display_name'] = Path(fd.get('filename', '')).stem or 'Unnamed'
-            except Exception:
-                fd_copy['display_name'] = Path(fd.get('filename', '')).stem or 'Unnamed'
+            if idx < len(file_basenames):
+                fd_copy['display_name'] = file_basenames[idx]
+            else:
+                fd_copy['display_name'] = Path(filename).stem or 'Unnamed'
 
-            # Detect and extract QA pairs
-            try:
-                qa_pairs = extract_qa_pairs(content)
-                fd_copy['qa_pairs'] = qa_pairs
-                fd_copy['has_questions'] = bool(qa_pairs) or detect_question_like(content)
-            except Exception:
+            # Detect and extract QA pairs (error placeholders cannot contain any)
+            if is_error_message:
                 fd_copy['qa_pairs'] = []
-                fd_copy['has_questions'] = detect_question_like(content)
+                fd_copy['has_questions'] = False
+            else:
+                fd_copy['qa_pairs'], fd_copy['has_questions'] = extract_qa_pairs(content)
 
             prepared.append(fd_copy)
 
         # Log prepared file summaries for debugging (filename, type, content length and whether it appears to contain Q/A)
-        try:
-            for i, fd in enumerate(prepared):
-                snippet = (fd.get('content_processed') or '')[:250].replace('\n', ' ')
-                logger.info(f"Prepared file idx={i} name={fd.get('filename')} type={fd.get('file_type')} len={len(fd.get('content_processed',''))} has_questions={fd.get('has_questions')} snippet='{snippet}'")
-        except Exception:
-            pass
-
-        # Create batches under total_limit
-        batches = []
-        current_batch = []
-        current_size = 0
-        for fd in prepared:
-            c = fd['content_processed']
-            # Approximate size impact: content length only (headers are small)
-            if current_size == 0:
-                current_batch.append(fd)
-                current_size += len(c)
-            else:
-                if current_size + len(c) > total_limit:
-                    batches.append(current_batch)
-                    current_batch = [fd]
-                    current_size = len(c)
+        for i, fd in enumerate(prepared):
+            content_processed = fd['content_processed']
+            snippet = content_processed[:250].replace('\n', ' ')
+            logger.info(f"Prepared file idx={i} name={fd.get('filename')} type={fd.get('file_type')} len={len(content_processed)} has_questions={fd.get('has_questions')} snippet='{snippet}'")
+
+        # Helper: parse the model's JSON reply into (summary, scores)
+        def parse_model_json(raw: str):
+            data = None
+            try:
+                data = json.loads(raw)
+            except (TypeError, ValueError):
+                try:
+                    match = re.search(r"\{[\s\S]*\}", raw)
+                    if match:
+                        data = json.loads(match.group(0))
+                except (TypeError, ValueError):
+                    data = None
+            if not isinstance(data, dict):
+                return None, None
+            return data.get("summary"), data.get("scores")
+
+        # Helper: group prepared file indices into as few batches under total_limit as possible
+        def pack_batches(indices):
+            # First-fit-decreasing: place the largest files first so small ones fill the gaps
+            bins = []  # [remaining capacity, member indices]
+            for i in sorted(indices, key=lambda k: -len(prepared[k]['content_processed'])):
+                # Approximate size impact: content length only (headers are small)
+                size = len(prepared[i]['content_processed'])
+                for b in bins:
+                    if size <= b[0]:
+                        b[0] -= size
+                        b[1].append(i)
+                        break
                 else:
-                    current_batch.append(fd)
-                    current_size += len(c)
-        if current_batch:
-            batches.append(current_batch)
+                    # Oversized files still get a batch of their own
+                    bins.append([total_limit - size, [i]])
+            # Keep files in upload order within each batch
+            return [sorted(members) for _, members in bins]
+
+        # Helper: re-grade selected files with one prompt per batch instead of one per file
+        async def regrade_batched(final_scores, indices, note: str, label: str):
+            groups = pack_batches(indices)
+            title = request.title or "Grading Task"
+            desc = (request.description or "").strip()
+            # Send all retry batches concurrently; results are merged in batch order below
+            responses = await asyncio.gather(
+                *(generate_limited(note + build_prompt(title, desc, [prepared[i] for i in group])) for group in groups),
+                return_exceptions=True,
+            )
+            for group, resp in zip(groups, responses):
+                if isinstance(resp, Exception):
+                    logger.debug(f"{label} for {len(group)} file(s) raised", exc_info=resp)
+                    continue
+                if not resp.get('success'):
+                    logger.debug(f"{label} for {len(group)} file(s) failed: {resp.get('error')}")
+                    continue
+                raw = resp.get('response', '')
+                _, scores_list = parse_model_json(raw)
+                if not isinstance(scores_list, list):
+                    scores_list = []
+                # Entries come back in the same order as the files were listed
+                for pos, i in enumerate(group):
+                    s = scores_list[pos] if pos < len(scores_list) else None
+                    if isinstance(s, dict):
+                        s['name'] = prepared[i].get('display_name') or s.get('name') or file_basenames[i]
+                        final_scores[i] = s
+                        logger.info(f"Recovered result for file {prepared[i].get('filename')} via {label}")
+                    elif raw:
+                        # If retry did not yield a usable score, attach raw response to reasoning for easier debugging
+                        final_scores[i]['reasoning'] = (final_scores[i].get('reasoning') or '') + f" Model raw {label} response: {raw[:500]}"
+
+        # Create batches under total_limit (each batch is a list of original prepared indices)
+        batches = pack_batches(range(len(prepared)))
 
         # Aggregate results across batches
         agg_scores = []
+        agg_sources = []  # original file index for each aggregated score (None if unknown)
         agg_summary_parts = []
         raw_concat = []
 
-        for batch in batches:
-            prompt = build_prompt(request.title, request.description, batch)
-            result = openrouter_service.generate(prompt)
+        # Grade all batches concurrently, then merge in batch order
+        results = await asyncio.gather(
+            *(generate_limited(build_prompt(request.title, request.description, [prepared[i] for i in group])) for group in batches),
+            return_exceptions=True,
+        )
+        for group, result in zip(batches, results):
+            batch = [prepared[i] for i in group]
+            if isinstance(result, Exception):
+                logger.warning(f"Batch of {len(group)} file(s) failed: {result}")
+                continue
             if not result.get("success"):
                 continue
             raw = result.get("response", "")
             raw_concat.append(raw)
-            b_summary = None
-            b_scores = None
-            try:
-                data = json.loads(raw)
-                b_summary = data.get("summary")
-                b_scores = data.get("scores")
-            except Exception:
-                try:
-                    match = re.search(r"\{[\s\S]*\}", raw)
-                    if match:
-                        data = json.loads(match.group(0))
-                        b_summary = data.get("summary")
-                        b_scores = data.get("scores")
-                except Exception:
-                    pass
+            b_summary, b_scores = parse_model_json(raw)
 
             # Map names for this batch using the corresponding basenames by index
-            try:
-                if isinstance(b_scores, list) and b_scores:
-                    # Use display_name carried into batch items
-                    batch_basenames = [fd.get('display_name') for fd in batch]
-
-                    if len(batch_basenames) == 1:
-                        base = batch_basenames[0] or "Unnamed"
-                        for s in b_scores:
-                            if isinstance(s, dict):
-                                s["name"] = base
-                    elif len(b_scores) == len(batch_basenames):
-                        for i, s in enumerate(b_scores):
-                            if isinstance(s, dict) and batch_basenames[i]:
-                                s["name"] = batch_basenames[i]
-                    else:
-                        m = min(len(b_scores), len(batch_basenames))
-                        for i in range(m):
-                            s = b_scores[i]
-                            if isinstance(s, dict) and batch_basenames[i]:
-                                s["name"] = batch_basenames[i]
-            except Exception:
-                pass
+            if isinstance(b_scores, list) and b_scores:
+                # Use display_name carried into batch items
+                batch_basenames = [fd.get('display_name') for fd in batch]
+
+                if len(batch_basenames) == 1:
+                    base = batch_basenames[0] or "Unnamed"
+                    for s in b_scores:
+                        if isinstance(s, dict):
+                            s["name"] = base
+                elif len(b_scores) == len(batch_basenames):
+                    for i, s in enumerate(b_scores):
+                        if isinstance(s, dict) and batch_basenames[i]:
+                            s["name"] = batch_basenames[i]
+                else:
+                    m = min(len(b_scores), len(batch_basenames))
+                    for i in range(m):
+                        s = b_scores[i]
+                        if isinstance(s, dict) and batch_basenames[i]:
+                            s["name"] = batch_basenames[i]
 
             if isinstance(b_scores, list):
                 agg_scores.extend(b_scores)
+                agg_sources.extend(group[k] if k < len(group) else None for k in range(len(b_scores)))
             if b_summary:
                 agg_summary_parts.append(b_summary)
 
@@ -1027,41 +1100,53 @@ async def generate_content(
         try:
             final_scores = []
             used_indices = set()
+            # Batches may be reordered by size, so map original file index -> aggregated score index
+            score_by_source = {}
+            for j, src in enumerate(agg_sources):
+                if src is not None:
+                    score_by_source.setdefault(src, j)
+            # Only dict entries can be matched; drop anything else the model returned up-front
+            dict_scores = [(j, s) for j, s in enumerate(agg_scores) if isinstance(s, dict)]
+            # Index returned names once (exact and case-insensitive); lists are reversed so pop() yields the earliest score
+            by_name = {}
+            by_name_ci = {}
+            for j, s in reversed(dict_scores):
+                name = s.get('name')
+                if name:
+                    name = str(name)
+                    by_name.setdefault(name, []).append(j)
+                    by_name_ci.setdefault(name.lower(), []).append(j)
+
+            def take_match(index, key):
+                candidates = index.get(key)
+                while candidates:
+                    j = candidates.pop()
+                    if j not in used_indices:
+                        return j
+                index.pop(key, None)
+                return None
+
             for idx, base in enumerate(file_basenames):
                 assigned = None
-                # First try exact name match against returned scores
-                for j, s in enumerate(agg_scores):
-                    if j in used_indices or not isinstance(s, dict):
-                        continue
-                    name = s.get('name') or ''
-                    if name and name == base:
-                        assigned = (j, s)
-                        break
-                # Then try case-insensitive match
+                # First try exact name match against returned scores, then case-insensitive match
+                j = take_match(by_name, base)
+                if j is None:
+                    j = take_match(by_name_ci, str(base).lower())
+                if j is not None:
+                    assigned = (j, agg_scores[j])
+                # Fallback: take the score returned at this file's position in its batch if unused
                 if not assigned:
-                    for j, s in enumerate(agg_scores):
-                        if j in used_indices or not isinstance(s, dict):
-                            continue
-                        name = s.get('name') or ''
-                        if name and name.lower() == str(base).lower():
-                            assigned = (j, s)
-                            break
-                # Fallback: take the score at the same index if available and unused
-                if not assigned and idx < len(agg_scores) and idx not in used_indices:
-                    assigned = (idx, agg_scores[idx])
+                    j = score_by_source.get(idx)
+                    if j is not None and j not in used_indices and isinstance(agg_scores[j], dict):
+                        assigned = (j, agg_scores[j])
                 if assigned:
                     j, s = assigned
                     used_indices.add(j)
                     final_scores.append(s)
                 else:
                     # Check if this file had an error during extraction
-                    file_has_error = False
-                    try:
-                        if idx < len(prepared):
-                            file_has_error = prepared[idx].get('is_error', False)
-                    except Exception:
-                        pass
-                    
+                    file_has_error = idx < len(prepared) and prepared[idx].get('is_error', False)
+
                     # Placeholder for missing result
                     if file_has_error:
                         final_scores.append({
@@ -1081,13 +1166,8 @@ async def generate_content(
             while len(final_scores) < len(file_basenames):
                 i = len(final_scores)
                 # Check if this file had an error during extraction
-                file_has_error = False
-                try:
-                    if i < len(prepared):
-                        file_has_error = prepared[i].get('is_error', False)
-                except Exception:
-                    pass
-                
+                file_has_error = i < len(prepared) and prepared[i].get('is_error', False)
+
                 if file_has_error:
                     final_scores.append({
                         'name': file_basenames[i] if i < len(file_basenames) else f'File {i+1}',
@@ -1110,151 +1190,45 @@ async def generate_content(
             if missing_count:
                 logger.warning(f"{missing_count} file(s) had no model results; placeholders were added.")
 
-                # Attempt per-file retry for missing results: query the model with a simplified prompt for each missing file
+                # Retry all missing results together: one prompt per total_limit-bounded batch
                 try:
-                    for i, s in enumerate(final_scores):
-                        if s.get('score_percent') is not None:
-                            continue
-                        # Get the corresponding prepared file if available
-                        try:
-                            fd = prepared[i]
-                        except Exception:
-                            fd = None
-
-                        if not fd:
-                            continue
-
-                        single_title = request.title or "Grading Task"
-                        single_desc = (request.description or "").strip()
-
-                        simple_parts = [
-                            f"Title: {single_title}\n",
-                            "You are a strict grader. Return ONLY JSON in the exact schema specified below. Be concise and conservative when assumptions are needed.\n",
-                            "Schema:\n{ \"summary\": string, \"scores\": [{ \"name\": string, \"score_percent\": number, \"reasoning\": string, \"details\": [] }] }\n",
-                            f"--- File: {fd.get('filename')} ({fd.get('file_type')}) ---\n",
-                            fd.get('content_processed') or fd.get('content') or "[No content]",
-                        ]
-                        simple_prompt = "\n".join(simple_parts)
-
-                        retry_resp = openrouter_service.generate(simple_prompt)
-                        if not retry_resp.get('success'):
-                            logger.debug(f"Retry for file {fd.get('filename')} failed: {retry_resp.get('error')}")
-                            continue
-                        raw_retry = retry_resp.get('response', '')
-                        # Try to parse JSON from response
-                        parsed = None
-                        try:
-                            parsed = json.loads(raw_retry)
-                        except Exception:
-                            try:
-                                m = re.search(r"\{[\s\S]*\}", raw_retry)
-                                if m:
-                                    parsed = json.loads(m.group(0))
-                            except Exception:
-                                parsed = None
-
-                        if parsed and isinstance(parsed, dict):
-                            scores_list = parsed.get('scores') or []
-                            if isinstance(scores_list, list) and scores_list:
-                                first_score = scores_list[0]
-                                if isinstance(first_score, dict):
-                                    # Ensure name and basic fields
-                                    first_score['name'] = file_basenames[i] if file_basenames and i < len(file_basenames) else first_score.get('name', file_basenames[i])
-                                    final_scores[i] = first_score
-                                    logger.info(f"Recovered result for file {fd.get('filename')} via single-file retry")
-                                    continue
-                        # If retry did not yield a usable score, attach raw response to reasoning for easier debugging
-                        if raw_retry:
-                            final_scores[i]['reasoning'] = (final_scores[i].get('reasoning') or '') + f" Model raw response on retry: {raw_retry[:500]}"
+                    missing = [i for i, s in enumerate(final_scores) if s.get('score_percent') is None and i < len(prepared)]
+                    await regrade_batched(
+                        final_scores,
+                        missing,
+                        "Note: these files previously failed to return a result - be especially thorough and return exactly one entry per file, in order.\n\n",
+                        "batched retry",
+                    )
 
                     # Additional targeted attempt: for files that returned a result but have no details or explicitly said 'No questions', ask the model to search for implicit Q/A and grade
-                    retried_search_indices = set()
+                    search_indices = []
                     for i, s in enumerate(final_scores):
-                        # Skip if details present
-                        if s.get('details'):
-                            continue
-                        reason = (s.get('reasoning') or '').lower()
-                        # Only attempt if not already retried and the prepared file exists and has content
-                        if i in retried_search_indices:
-                            continue
-                        try:
-                            fd = prepared[i]
-                        except Exception:
-                            fd = None
-                        if not fd:
+                        if s.get('details') or i >= len(prepared):
                             continue
-                        content_text = (fd.get('content_processed') or '').strip()
-                        if not content_text or len(content_text) < 10:
+                        content_text = (prepared[i].get('content_processed') or '').strip()
+                        if len(content_text) < 10:
                             continue
+                        reason = (s.get('reasoning') or '').lower()
                         if 'no questions' not in reason and s.get('score_percent') not in (None, 0):
                             # skip if the reason is not a 'no question' case and score is non-zero
                             continue
-
-                        # Build an aggressive search-and-grade prompt that asks the model to hunt for implicit Q/A
-                        search_parts = [
-                            f"Title: {request.title or 'Grading Task'}\n",
-                            "Instruction: The file below may not use explicit 'Question' markers. Search the content thoroughly for question-like text and the corresponding student answers. If you find none, say explicitly 'No questions found'. Otherwise, grade each student's answers and return ONLY JSON using this schema. Be conservative and do not hallucinate.",
-                            "Schema:\n{ \"summary\": string, \"scores\": [{ \"name\": string, \"score_percent\": number, \"reasoning\": string, \"details\": [{\"question\": string, \"student_answer\": string, \"correct_answer\": string, \"is_correct\": boolean, \"feedback\": string}] }] }\n",
-                            f"--- File: {fd.get('filename')} ({fd.get('file_type')}) ---\n",
-                            content_text
-                        ]
-                        search_prompt = "\n".join(search_parts)
-
-                        try:
-                            resp = openrouter_service.generate(search_prompt)
-                            if not resp.get('success'):
-                                logger.debug(f"Search retry for file {fd.get('filename')} failed: {resp.get('error')}")
-                                continue
-                            raw = resp.get('response', '')
-                            parsed = None
-                            try:
-                                parsed = json.loads(raw)
-                            except Exception:
-                                try:
-                                    m = re.search(r"\{[\s\S]*\}", raw)
-                                    if m:
-                                        parsed = json.loads(m.group(0))
-                                except Exception:
-                                    parsed = None
-
-                            if parsed and isinstance(parsed, dict):
-                                scores_list = parsed.get('scores') or []
-                                if isinstance(scores_list, list) and scores_list:
-                                    first_score = scores_list[0]
-                                    if isinstance(first_score, dict):
-                                        first_score['name'] = fd.get('display_name') or first_score.get('name') or file_basenames[i]
-                                        final_scores[i] = first_score
-                                        retried_search_indices.add(i)
-                                        logger.info(f"Recovered detailed grading for file {fd.get('filename')} via search-and-grade retry")
-                                        continue
-                            # If nothing usable, append raw response for debugging
-                            if raw:
-                                final_scores[i]['reasoning'] = (final_scores[i].get('reasoning') or '') + f" Model raw search response: {raw[:500]}"
-                        except Exception:
-                            logger.debug(f"Exception during search retry for file {fd.get('filename')}", exc_info=True)
+                        search_indices.append(i)
+                    await regrade_batched(
+                        final_scores,
+                        search_indices,
+                        "Instruction: The files below may not use explicit 'Question' markers. Search each file thoroughly for question-like text and the corresponding student answers. If a file has none, say explicitly 'No questions found' in its reasoning. Be conservative and do not hallucinate.\n\n",
+                        "search-and-grade retry",
+                    )
 
                 except Exception:
-                    # keep silent on retry failures but log at debug level
-                    import traceback
-                    logger.debug("Exception during per-file retry: " + traceback.format_exc())
+                    # keep silent on retry failures but log at debug level (formatted only if DEBUG is enabled)
+                    logger.debug("Exception during per-file retry", exc_info=True)
         except Exception:
             # If anything goes wrong here, silently continue to cleanup and return available results
-            pass
+            logger.debug("Exception while aligning scores", exc_info=True)
 
-        # Clean up temporary files
-        for file_path in file_paths_to_cleanup:
-            try:
-                if file_path.exists():
-                    file_path.unlink()
-            except:
-                pass
-        # Clean up metadata files
-        for meta_path in meta_paths_to_cleanup:
-            try:
-                if meta_path and meta_path.exists():
-                    meta_path.unlink()
-            except:
-                pass
+        # Clean up temporary and metadata files after the response is sent
+        background.add_task(_cleanup_paths, file_paths_to_cleanup + meta_paths_to_cleanup)
         
         # Return combined results across all batches
         return GenerateResponse(
@@ -1267,13 +1241,8 @@ async def generate_content(
     except HTTPException:
         raise
     except Exception as e:
-        # Clean up on error
-        for file_path in file_paths_to_cleanup:
-            try:
-                if file_path.exists():
-                    file_path.unlink()
-            except:
-                pass
+        # Clean up on error (inline: background tasks do not run when the endpoint raises)
+        _cleanup_paths(file_paths_to_cleanup)
         
         raise HTTPException(
             status_code=500,
@@ -1303,7 +1272,8 @@ async def evaluate_git_repository(
     github_url = request.github_url.strip()
     
     # Validate GitHub URL format
-    if 'github.com' not in github_url.lower():
+    url_match = _GITHUB_URL_RE.match(github_url)
+    if not url_match:
         return GitEvaluateResponse(
             success=False,
             result=None,
@@ -1311,60 +1281,66 @@ async def evaluate_git_repository(
             raw_response=None,
         )
     
-    try:
-        logger.info(f"Evaluating GitHub repository: {github_url}")
+    # Identical concurrent requests share one fetch + LLM pipeline
+    async def run_evaluation() -> GitEvaluateResponse:
+        try:
+            logger.info(f"Evaluating GitHub repository: {github_url}")
         
-        # Fetch all files from the repository (including nested files)
-        # Increase max_files limit for comprehensive evaluation
-        max_files = int(os.getenv("GIT_EVAL_MAX_FILES", "200"))
-        github_files = github_service.fetch_repository_files(github_url, max_files=max_files)
+            # Fetch all files from the repository (including nested files)
+            # Increase max_files limit for comprehensive evaluation
+            max_files = int(os.getenv("GIT_EVAL_MAX_FILES", "200"))
+            github_files = await fetch_repository_files_shared(github_url, max_files=max_files, owner_repo=url_match.group('owner', 'repo'))
         
-        if not github_files:
-            # Instead of raising 404, return success=False so the frontend
-            # gets a normal 200 response with a clear error message.
-            return GitEvaluateResponse(
-                success=False,
-                result=None,
-                error="No files found in the repository. Please check if the repository is public and accessible.",
-                raw_response=None,
-            )
+            if not github_files:
+                # Instead of raising 404, return success=False so the frontend
+                # gets a normal 200 response with a clear error message.
+                return GitEvaluateResponse(
+                    success=False,
+                    result=None,
+                    error="No files found in the repository. Please check if the repository is public and accessible.",
+                    raw_response=None,
+                )
+        
+            logger.info(f"Fetched {len(github_files)} files from repository")
         
-        logger.info(f"Fetched {len(github_files)} files from repository")
+            # Evaluate the repository using the GitEvaluator
+            # The evaluator is synchronous (blocking LLM call); run it off the event loop
+            evaluation_result = await asyncio.to_thread(git_evaluator.evaluate_repository, github_url, github_files)
         
-        # Evaluate the repository using the GitEvaluator
-        evaluation_result = git_evaluator.evaluate_repository(github_url, github_files)
+            if not evaluation_result.get("success"):
+                error_msg = evaluation_result.get("error", "Unknown error during evaluation")
+                return GitEvaluateResponse(
+                    success=False,
+                    result=None,
+                    error=f"Error evaluating repository: {error_msg}",
+                    raw_response=evaluation_result.get("raw_response"),
+                )
         
-        if not evaluation_result.get("success"):
-            error_msg = evaluation_result.get("error", "Unknown error during evaluation")
+            # Return the evaluation results
+            return GitEvaluateResponse(
+                success=True,
+                result=evaluation_result.get("result"),
+                raw_response=evaluation_result.get("raw_response")
+            )
+    
+        except HTTPException as http_exc:
+            # Convert unexpected HTTPExceptions into a structured 200 response
+            logger.error(f"HTTP error during Git repository evaluation: {http_exc.detail}")
             return GitEvaluateResponse(
                 success=False,
                 result=None,
-                error=f"Error evaluating repository: {error_msg}",
-                raw_response=evaluation_result.get("raw_response"),
+                error=str(http_exc.detail),
+                raw_response=None,
             )
-        
-        # Return the evaluation results
-        return GitEvaluateResponse(
-            success=True,
-            result=evaluation_result.get("result"),
-            raw_response=evaluation_result.get("raw_response")
-        )
-    
-    except HTTPException as http_exc:
-        # Convert unexpected HTTPExceptions into a structured 200 response
-        logger.error(f"HTTP error during Git repository evaluation: {http_exc.detail}")
-        return GitEvaluateResponse(
-            success=False,
-            result=None,
-            error=str(http_exc.detail),
-            raw_response=None,
-        )
-    except Exception as e:
-        logger.error(f"Error evaluating Git repository: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error evaluating repository: {str(e)}"
-        )
+        except Exception as e:
+            logger.error(f"Error evaluating Git repository: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error evaluating repository: {str(e)}"
+            )
+
+    key = ('evaluate', '/'.join(url_match.group('owner', 'repo')).lower())
+    return await run_coalesced(key, run_evaluation)
 
 
 @app.post("/grade-git", response_model=GitGradeResponse)
@@ -1391,7 +1367,8 @@ async def grade_git_repository(
             raw_response=None,
         )
 
-    if "github.com" not in github_url.lower():
+    url_match = _GITHUB_URL_RE.match(github_url)
+    if not url_match:
         return GitGradeResponse(
             success=False,
             result=None,
@@ -1408,50 +1385,56 @@ async def grade_git_repository(
             raw_response=None,
         )
 
-    try:
-        logger.info(f"Grading GitHub repository: {github_url} against user rules")
+    async def run_grading() -> GitGradeResponse:
+        try:
+            logger.info(f"Grading GitHub repository: {github_url} against user rules")
 
-        max_files = int(os.getenv("GIT_EVAL_MAX_FILES", "200"))
-        github_files = github_service.fetch_repository_files(github_url, max_files=max_files)
+            max_files = int(os.getenv("GIT_EVAL_MAX_FILES", "200"))
+            github_files = await fetch_repository_files_shared(github_url, max_files=max_files, owner_repo=url_match.group('owner', 'repo'))
 
-        if not github_files:
-            return GitGradeResponse(
-                success=False,
-                result=None,
-                error="No files found in the repository. Please check if the repository is public and accessible.",
-                raw_response=None,
-            )
+            if not github_files:
+                return GitGradeResponse(
+                    success=False,
+                    result=None,
+                    error="No files found in the repository. Please check if the repository is public and accessible.",
+                    raw_response=None,
+                )
 
-        grading_result = git_evaluator.grade_repository(github_url, github_files, description)
+            grading_result = await asyncio.to_thread(git_evaluator.grade_repository, github_url, github_files, description)
+
+            if not grading_result.get("success"):
+                return GitGradeResponse(
+                    success=False,
+                    result=None,
+                    error=grading_result.get("error", "Unknown error during grading"),
+                    raw_response=grading_result.get("raw_response"),
+                )
 
-        if not grading_result.get("success"):
             return GitGradeResponse(
-                success=False,
-                result=None,
-                error=grading_result.get("error", "Unknown error during grading"),
+                success=True,
+                result=grading_result.get("result"),
                 raw_response=grading_result.get("raw_response"),
             )
 
-        return GitGradeResponse(
-            success=True,
-            result=grading_result.get("result"),
-            raw_response=grading_result.get("raw_response"),
-        )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error grading Git repository: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error grading repository: {str(e)}"
+            )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error grading Git repository: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error grading repository: {str(e)}"
-        )
+    description_hash = hashlib.blake2b(description.encode(), digest_size=8).hexdigest()
+    key = ('grade', '/'.join(url_match.group('owner', 'repo')).lower(), description_hash)
+    return await run_coalesced(key, run_grading)
 
 
 @app.get("/openrouter/status")
 def check_openrouter_status():
     """Check if Ollama is running and available"""
     is_connected = openrouter_service.check_connection()
+    # The model list comes from list_models' TTL cache, so polling this endpoint doesn't refetch it each time
     models = openrouter_service.list_models() if is_connected else []
     
     return {
@@ -1466,82 +1449,55 @@ def check_openrouter_status():
 def debug_extracted(file_id: str, current_user: User = Depends(get_current_user)):
     """Return the extracted text and a quick QA hint for a given uploaded file id for debugging extraction issues."""
     file_path = None
-    for saved_file in UPLOAD_DIR.glob(f"{file_id}.*"):
-        if saved_file.name == f"{file_id}.meta.json":
-            continue
-        file_path = saved_file
-        break
+    # The upload's meta.json records its extension, so the saved file can be located without scanning UPLOAD_DIR
+    try:
+        with open(UPLOAD_DIR / f"{file_id}.meta.json", "r", encoding="utf-8") as m:
+            md = json.load(m)
+        ext = md.get("ext") if isinstance(md, dict) else None
+        if isinstance(ext, str):
+            candidate = UPLOAD_DIR / f"{file_id}{ext}"
+            if candidate.is_file():
+                file_path = candidate
+    except (OSError, ValueError):
+        pass
+
+    # Older uploads (or ones whose meta write failed) have no ext entry; fall back to a glob
+    if file_path is None:
+        for saved_file in UPLOAD_DIR.glob(f"{file_id}.*"):
+            if saved_file.name == f"{file_id}.meta.json":
+                continue
+            file_path = saved_file
+            break
 
     if not file_path or not file_path.exists():
         raise HTTPException(status_code=404, detail=f"File with ID {file_id} not found")
 
-    file_data = file_processor.read_file(str(file_path))
-    content = file_data.get('content', '') or ''
-
-    # Quick QA extractor (same heuristics as the main batch pipeline)
-    def extract_qa_pairs_local(text: str):
-        qa = []
-        if not text or not isinstance(text, str):
-            return qa
-        lines = [l.rstrip() for l in text.splitlines()]
-        i = 0
-        question_re = re.compile(r"^\s*(?:Question\b[:\s]*|Q\d*[:\s]*|Q\d+\b|\d+\s*[\.)\-:])", flags=re.IGNORECASE)
-        answer_marker_re = re.compile(r"\bAnswer\b[:\s]*", flags=re.IGNORECASE)
-
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line:
-                i += 1
-                continue
-            if '\t' in line:
-                cells = [c.strip() for c in line.split('\t')]
-                lc = [c.lower() for c in cells]
-                if any('question' in c for c in lc) or any('answer' in c for c in lc) or any('q' == c for c in lc):
-                    q = cells[0]
-                    a = cells[1] if len(cells) > 1 else ''
-                    qa.append({'question': q, 'answer': a})
-                    i += 1
-                    continue
-            if question_re.search(line) or '?' in line:
-                qtext = re.sub(r"^\s*(?:Question\b[:\s]*|Q\d*[:\s]*|\d+\s*[\.)\-:]\s*)", '', line, flags=re.IGNORECASE)
-                ans_lines = []
-                j = i + 1
-                while j < len(lines):
-                    l = lines[j].strip()
-                    if not l:
-                        j += 1
-                        if j < len(lines) and question_re.search(lines[j]):
-                            break
-                        continue
-                    if question_re.search(l):
-                        break
-                    if answer_marker_re.search(l):
-                        a = answer_marker_re.sub('', l).strip()
-                        if a:
-                            ans_lines.append(a)
-                        j += 1
-                        while j < len(lines) and not question_re.search(lines[j]):
-                            if lines[j].strip():
-                                ans_lines.append(lines[j].strip())
-                            j += 1
-                        break
-                    ans_lines.append(l)
-                    j += 1
-                answer = ' '.join(ans_lines).strip()
-                qa.append({'question': qtext.strip() or line, 'answer': answer or None})
-                i = j
-                continue
-            i += 1
-        return qa
+    extension = file_path.suffix.lower()
+    if extension in file_processor.TEXT_EXTENSIONS:
+        # Plain text: read only up to the cap instead of materializing the whole file
+        with open(file_path, "rb") as f:
+            raw = f.read(DEBUG_MAX_BYTES + 1)
+        truncated = len(raw) > DEBUG_MAX_BYTES
+        file_data = {
+            'filename': file_path.name,
+            'content': FileProcessor.decode_text(raw[:DEBUG_MAX_BYTES], final=not truncated),
+            'file_type': 'text',
+            'extension': extension
+        }
+    else:
+        # Binary formats need the full extractor; cap what we scan and return
+        file_data = file_processor.read_file(str(file_path))
+        truncated = len(file_data.get('content', '') or '') > DEBUG_MAX_BYTES
+    content = (file_data.get('content', '') or '')[:DEBUG_MAX_BYTES]
 
-    qa_pairs = extract_qa_pairs_local(content)
-    has_questions = bool(qa_pairs) or bool(re.search(r"\bQ(?:uestion)?\s*\d+\b|\bQ\d+\b|\bQuestion:\b|\bName:\b|\bStudent:\b|\bCandidate:\b|^\d+\.\s", content, flags=re.IGNORECASE | re.MULTILINE))
+    qa_pairs, has_questions = extract_qa_pairs(content)
 
     return {
         'filename': file_data.get('filename'),
         'extension': file_data.get('extension'),
         'file_type': file_data.get('file_type'),
         'content': content,
+        'truncated': truncated,
         'qa_pairs': qa_pairs,
         'has_questions': has_questions
     }
@@ -1,12 +1,36 @@
 import os
-from typing import Dict, List, Optional
+import json
+import time
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 load_dotenv()
 
 
+def _json_loads(data):
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    return orjson.dumps(obj) if ORJSON_AVAILABLE else json.dumps(obj).encode("utf-8")
+
+
 class OpenRouterService:
+    GRADER_SYSTEM_MESSAGE = "You are a strict grader that returns JSON only."
+    VISION_SYSTEM_MESSAGE = "You are an expert presentation design evaluator. Return ONLY valid JSON, no other text."
+    # Sent with json_mode=True; providers that honour it return a bare JSON object (no fences or prose)
+    JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
     def __init__(self):
         self.base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
         self.api_key = os.getenv("OPENROUTER_API_KEY", "")
@@ -17,8 +41,59 @@ class OpenRouterService:
         self.stream = False
         self.referer = os.getenv("OPENROUTER_HTTP_REFERER", "http://localhost:8000")
         self.title = os.getenv("OPENROUTER_TITLE", "Grading App")
+        # Upper bound on pooled connections per client; concurrent evaluations share these instead of reconnecting
+        self.max_connections = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "32"))
+        # Persistent session for the sync methods so TCP/TLS connections are reused across calls
+        self._session = requests.Session()
+        adapter = HTTPAdapter(max_retries=0, pool_connections=16, pool_maxsize=self.max_connections)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update(self._headers())
+        # Shared async client for the agenerate* methods; created lazily because no event loop exists at import time
+        self._async_client: Optional[httpx.AsyncClient] = None
+        # (fetched_at, model ids) from the last successful list_models() call
+        self._models_cache: Optional[Tuple[float, List[str]]] = None
+        self._models_ttl = float(os.getenv("OPENROUTER_MODELS_TTL", "300"))
+        # System-message entries for the default prompts, shared by every payload that uses them
+        self._grader_system_msg = {"role": "system", "content": self.GRADER_SYSTEM_MESSAGE}
+        self._vision_system_msg = {"role": "system", "content": self.VISION_SYSTEM_MESSAGE}
+        # monotonic time before which requests should wait (set when x-ratelimit-remaining runs low)
+        self._throttle_until = 0.0
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                timeout=self.timeout,
+                # HTTP/2 multiplexes concurrent requests over few connections; cap both pool and keep-alive
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP clients (call on application shutdown)"""
+        self._session.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    @property
+    def api_key(self) -> str:
+        return self._api_key
+
+    @api_key.setter
+    def api_key(self, value: str) -> None:
+        self._api_key = value
+        # Rebuild the cached headers (and the pooled session's copy) when the key rotates
+        self._cached_headers = None
+        if getattr(self, "_session", None) is not None:
+            self._session.headers.pop("Authorization", None)
+            self._session.headers.update(self._headers())
 
     def _headers(self) -> Dict[str, str]:
+        """Request headers; built once and shared by every call until api_key changes"""
+        if self._cached_headers is not None:
+            return self._cached_headers
         headers = {
             "Content-Type": "application/json",
         }
@@ -28,39 +103,99 @@ class OpenRouterService:
             headers["HTTP-Referer"] = self.referer
         if self.title:
             headers["X-Title"] = self.title
+        self._cached_headers = headers
         return headers
 
-    def generate(self, prompt: str, model: Optional[str] = None, system_message: Optional[str] = None) -> Dict:
+    @staticmethod
+    def _system_entry(system_message: Optional[str], default: Dict[str, str]) -> Dict[str, str]:
+        """Return the shared default entry unless the caller supplied its own system message"""
+        if system_message is None:
+            return default
+        return {"role": "system", "content": system_message}
+
+    @staticmethod
+    def _seconds_until(reset: str) -> float:
+        reset_ts = float(reset)
+        # OpenRouter reports the reset time in epoch milliseconds; accept seconds too
+        if reset_ts > 1e12:
+            reset_ts /= 1000.0
+        return reset_ts - time.time()
+
+    def _retry_delay(self, headers, attempt: int) -> float:
+        """
+        Seconds to wait before the next attempt
+        Uses the server's Retry-After / x-ratelimit-reset hint when present, else exponential backoff
+        """
+        if headers:
+            delay = None
+            try:
+                if headers.get("retry-after") is not None:
+                    delay = float(headers["retry-after"])
+                elif headers.get("x-ratelimit-reset") is not None:
+                    delay = self._seconds_until(headers["x-ratelimit-reset"])
+            except ValueError:
+                # Retry-After may also be an HTTP date; fall back to backoff
+                delay = None
+            if delay is not None:
+                return min(max(delay, 0.1), 30.0)
+        return self.backoff_base * (2 ** attempt)
+
+    def _note_rate_limit(self, headers) -> None:
+        """Remember to pause before the next request when the rate-limit window is nearly used up"""
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            if int(remaining) < 5:
+                self._throttle_until = time.monotonic() + min(max(self._seconds_until(reset), 0.0), 30.0)
+        except ValueError:
+            pass
+
+    def _throttle_delay(self) -> float:
+        return max(0.0, self._throttle_until - time.monotonic())
+
+    def generate(self, prompt: str, model: Optional[str] = None, system_message: Optional[str] = None,
+                 json_mode: bool = False) -> Dict:
         if not prompt or not prompt.strip():
             return {"success": False, "error": "Empty prompt sent to model", "response": ""}
 
         model = model or self.model
         # Default system message for grading (file uploads)
-        default_system_message = "You are a strict grader that returns JSON only."
-        system_msg = system_message if system_message is not None else default_system_message
+        system_entry = self._system_entry(system_message, self._grader_system_msg)
         
         url = f"{self.base_url}/chat/completions"
         payload = {
             "model": model,
             "messages": [
-                {"role": "system", "content": system_msg},
+                system_entry,
                 {"role": "user", "content": prompt},
             ],
             "stream": self.stream,
         }
+        if json_mode:
+            payload["response_format"] = self.JSON_RESPONSE_FORMAT
 
+        # Serialize once; retries resend the same bytes
+        body = _json_dumps(payload)
         attempt = 0
         last_err = None
         while attempt <= self.max_retries:
+            retry_headers = None
             try:
-                resp = requests.post(url, json=payload, headers=self._headers(), timeout=self.timeout)
+                throttle_s = self._throttle_delay()
+                if throttle_s:
+                    time.sleep(throttle_s)
+                resp = self._session.post(url, data=body, timeout=self.timeout)
+                self._note_rate_limit(resp.headers)
                 if resp.status_code == 401:
                     return {"success": False, "error": "Unauthorized. Set OPENROUTER_API_KEY.", "response": ""}
                 # Retry on 429 and 5xx
                 if resp.status_code in (429, 500, 502, 503, 504):
+                    retry_headers = resp.headers
                     raise requests.exceptions.RequestException(f"HTTP {resp.status_code}: transient error")
                 resp.raise_for_status()
-                data = resp.json()
+                data = _json_loads(resp.content)
                 content = ""
                 try:
                     content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -71,9 +206,8 @@ class OpenRouterService:
                 last_err = str(e)
                 if attempt == self.max_retries:
                     break
-                # simple exponential backoff
-                import time
-                sleep_s = self.backoff_base * (2 ** attempt)
+                # honour the server's retry hint, else exponential backoff
+                sleep_s = self._retry_delay(retry_headers, attempt)
                 try:
                     time.sleep(sleep_s)
                 except Exception:
@@ -85,52 +219,157 @@ class OpenRouterService:
 
         return {"success": False, "error": f"OpenRouter transient error after retries: {last_err}", "response": ""}
 
+    async def _apost_chat(self, payload: Dict, model: str) -> Dict:
+        """POST a chat completion without blocking the event loop, retrying on transient errors"""
+        url = f"{self.base_url}/chat/completions"
+        client = self._get_async_client()
+
+        # Serialize once; retries resend the same bytes
+        body = _json_dumps(payload)
+        attempt = 0
+        last_err = None
+        while attempt <= self.max_retries:
+            retry_headers = None
+            try:
+                throttle_s = self._throttle_delay()
+                if throttle_s:
+                    await asyncio.sleep(throttle_s)
+                resp = await client.post(url, content=body, headers=self._headers())
+                self._note_rate_limit(resp.headers)
+                if resp.status_code == 401:
+                    return {"success": False, "error": "Unauthorized. Set OPENROUTER_API_KEY.", "response": ""}
+                # Retry on 429 and 5xx
+                if resp.status_code in (429, 500, 502, 503, 504):
+                    retry_headers = resp.headers
+                    raise httpx.HTTPError(f"HTTP {resp.status_code}: transient error")
+                resp.raise_for_status()
+                data = _json_loads(resp.content)
+                content = ""
+                try:
+                    content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+                except Exception:
+                    content = ""
+                return {"success": True, "response": content, "model": model, "done": True}
+            except httpx.HTTPError as e:
+                last_err = str(e)
+                if attempt == self.max_retries:
+                    break
+                # honour the server's retry hint, else exponential backoff
+                await asyncio.sleep(self._retry_delay(retry_headers, attempt))
+                attempt += 1
+                continue
+            except Exception as e:
+                return {"success": False, "error": f"OpenRouter error: {str(e)}", "response": ""}
+
+        return {"success": False, "error": f"OpenRouter transient error after retries: {last_err}", "response": ""}
+
+    async def agenerate(self, prompt: str, model: Optional[str] = None, system_message: Optional[str] = None,
+                        json_mode: bool = False) -> Dict:
+        """
+        Async variant of generate() for use from async endpoints
+        Returns the same result dict as generate()
+        """
+        if not prompt or not prompt.strip():
+            return {"success": False, "error": "Empty prompt sent to model", "response": ""}
+
+        model = model or self.model
+        # Default system message for grading (file uploads)
+        system_entry = self._system_entry(system_message, self._grader_system_msg)
+
+        payload = {
+            "model": model,
+            "messages": [
+                system_entry,
+                {"role": "user", "content": prompt},
+            ],
+            "stream": self.stream,
+        }
+        if json_mode:
+            payload["response_format"] = self.JSON_RESPONSE_FORMAT
+        return await self._apost_chat(payload, model)
+
+    async def agenerate_with_images(self, messages: List[Dict], model: Optional[str] = None, system_message: Optional[str] = None,
+                                    json_mode: bool = False) -> Dict:
+        """
+        Async variant of generate_with_images() for use from async endpoints
+        messages: List of message dicts with content that can include images
+        """
+        model = model or self.model
+        # Default system message for design evaluation
+        system_entry = self._system_entry(system_message, self._vision_system_msg)
+
+        payload = {
+            "model": model,
+            "messages": [system_entry, *messages],
+            "stream": self.stream,
+        }
+        if json_mode:
+            payload["response_format"] = self.JSON_RESPONSE_FORMAT
+        return await self._apost_chat(payload, model)
+
     def list_models(self) -> List[str]:
+        # Model lists rarely change; serve from cache until the TTL expires
+        if self._models_cache and time.monotonic() - self._models_cache[0] < self._models_ttl:
+            return self._models_cache[1]
         try:
             url = f"{self.base_url}/models"
-            resp = requests.get(url, headers=self._headers(), timeout=10)
+            resp = self._session.get(url, timeout=10)
             if resp.status_code != 200:
                 return []
-            data = resp.json()
+            data = _json_loads(resp.content)
             models = data.get("data", [])
-            return [m.get("id", "") for m in models if isinstance(m, dict)]
+            model_ids = [m.get("id", "") for m in models if isinstance(m, dict)]
+            self._models_cache = (time.monotonic(), model_ids)
+            return model_ids
         except Exception:
             return []
 
-    def generate_with_images(self, messages: List[Dict], model: Optional[str] = None, system_message: Optional[str] = None) -> Dict:
+    def generate_with_images(self, messages: Union[List[Dict], Callable[[], List[Dict]]], model: Optional[str] = None,
+                             system_message: Optional[str] = None, json_mode: bool = False) -> Dict:
         """
         Generate response with images (vision model support)
-        messages: List of message dicts with content that can include images
+        messages: List of message dicts with content that can include images, or a zero-argument
+        function returning them; with a function no caller frame holds the list, so it is freed once serialized
         """
         model = model or self.model
         # Default system message for design evaluation
-        default_system_message = "You are an expert presentation design evaluator. Return ONLY valid JSON, no other text."
-        system_msg = system_message if system_message is not None else default_system_message
+        system_entry = self._system_entry(system_message, self._vision_system_msg)
         
-        # Build messages list with system message
-        full_messages = [
-            {"role": "system", "content": system_msg}
-        ] + messages
+        if callable(messages):
+            messages = messages()
         
         url = f"{self.base_url}/chat/completions"
         payload = {
             "model": model,
-            "messages": full_messages,
+            "messages": [system_entry, *messages],
             "stream": self.stream,
         }
+        if json_mode:
+            payload["response_format"] = self.JSON_RESPONSE_FORMAT
 
+        # Serialize once; retries resend the same bytes
+        body = _json_dumps(payload)
+        # Base64 data URLs make the messages as large as the body; when they were built from a function
+        # this drops the last reference, so only the body stays alive during the request and any retries
+        del payload, messages
         attempt = 0
         last_err = None
         while attempt <= self.max_retries:
+            retry_headers = None
             try:
-                resp = requests.post(url, json=payload, headers=self._headers(), timeout=self.timeout)
+                throttle_s = self._throttle_delay()
+                if throttle_s:
+                    time.sleep(throttle_s)
+                resp = self._session.post(url, data=body, timeout=self.timeout)
+                self._note_rate_limit(resp.headers)
                 if resp.status_code == 401:
                     return {"success": False, "error": "Unauthorized. Set OPENROUTER_API_KEY.", "response": ""}
                 # Retry on 429 and 5xx
                 if resp.status_code in (429, 500, 502, 503, 504):
+                    retry_headers = resp.headers
                     raise requests.exceptions.RequestException(f"HTTP {resp.status_code}: transient error")
                 resp.raise_for_status()
-                data = resp.json()
+                data = _json_loads(resp.content)
                 content = ""
                 try:
                     content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -141,9 +380,8 @@ class OpenRouterService:
                 last_err = str(e)
                 if attempt == self.max_retries:
                     break
-                # simple exponential backoff
-                import time
-                sleep_s = self.backoff_base * (2 ** attempt)
+                # honour the server's retry hint, else exponential backoff
+                sleep_s = self._retry_delay(retry_headers, attempt)
                 try:
                     time.sleep(sleep_s)
                 except Exception:
@@ -155,10 +393,181 @@ class OpenRouterService:
 
         return {"success": False, "error": f"OpenRouter transient error after retries: {last_err}", "response": ""}
 
+    @staticmethod
+    def _sse_delta(line) -> str:
+        """Return the content delta carried by one server-sent-events line ('' for anything else)"""
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        if not line.startswith("data:"):
+            # Blank separators and ': OPENROUTER PROCESSING' keep-alive comments
+            return ""
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            return ""
+        try:
+            chunk = _json_loads(data)
+        except ValueError:
+            return ""
+        choices = chunk.get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content") or ""
+
+    def generate_stream(self, prompt: str, model: Optional[str] = None, system_message: Optional[str] = None,
+                        stop_when: Optional[Callable[[str], bool]] = None, json_mode: bool = False) -> Dict:
+        """
+        Stream a chat completion and accumulate its content deltas
+        stop_when(text) is checked whenever a delta closes a brace; returning True ends the stream early
+        Falls back to generate() (with its retries) if the stream cannot be opened
+        """
+        if not prompt or not prompt.strip():
+            return {"success": False, "error": "Empty prompt sent to model", "response": ""}
+
+        model = model or self.model
+        system_entry = self._system_entry(system_message, self._grader_system_msg)
+        url = f"{self.base_url}/chat/completions"
+        payload = {
+            "model": model,
+            "messages": [system_entry, {"role": "user", "content": prompt}],
+            "stream": True,
+        }
+        if json_mode:
+            payload["response_format"] = self.JSON_RESPONSE_FORMAT
+        body = _json_dumps(payload)
+
+        parts = []
+        try:
+            throttle_s = self._throttle_delay()
+            if throttle_s:
+                time.sleep(throttle_s)
+            with self._session.post(url, data=body, timeout=self.timeout, stream=True) as resp:
+                self._note_rate_limit(resp.headers)
+                if resp.status_code != 200:
+                    return self.generate(prompt, model=model, system_message=system_message, json_mode=json_mode)
+                for line in resp.iter_lines():
+                    delta = self._sse_delta(line)
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    if stop_when and "}" in delta and stop_when("".join(parts)):
+                        break
+        except requests.exceptions.RequestException as e:
+            if not parts:
+                return self.generate(prompt, model=model, system_message=system_message, json_mode=json_mode)
+            return {"success": False, "error": f"OpenRouter stream interrupted: {str(e)}", "response": ""}
+
+        return {"success": True, "response": "".join(parts), "model": model, "done": True}
+
+    async def agenerate_stream(self, prompt: str, model: Optional[str] = None, system_message: Optional[str] = None,
+                               stop_when: Optional[Callable[[str], bool]] = None, json_mode: bool = False) -> Dict:
+        """
+        Async variant of generate_stream()
+        """
+        if not prompt or not prompt.strip():
+            return {"success": False, "error": "Empty prompt sent to model", "response": ""}
+
+        model = model or self.model
+        system_entry = self._system_entry(system_message, self._grader_system_msg)
+        url = f"{self.base_url}/chat/completions"
+        payload = {
+            "model": model,
+            "messages": [system_entry, {"role": "user", "content": prompt}],
+            "stream": True,
+        }
+        if json_mode:
+            payload["response_format"] = self.JSON_RESPONSE_FORMAT
+        body = _json_dumps(payload)
+
+        parts = []
+        client = self._get_async_client()
+        try:
+            throttle_s = self._throttle_delay()
+            if throttle_s:
+                await asyncio.sleep(throttle_s)
+            async with client.stream("POST", url, content=body, headers=self._headers()) as resp:
+                self._note_rate_limit(resp.headers)
+                if resp.status_code != 200:
+                    return await self.agenerate(prompt, model=model, system_message=system_message, json_mode=json_mode)
+                async for line in resp.aiter_lines():
+                    delta = self._sse_delta(line)
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    if stop_when and "}" in delta and stop_when("".join(parts)):
+                        break
+        except httpx.HTTPError as e:
+            if not parts:
+                return await self.agenerate(prompt, model=model, system_message=system_message, json_mode=json_mode)
+            return {"success": False, "error": f"OpenRouter stream interrupted: {str(e)}", "response": ""}
+
+        return {"success": True, "response": "".join(parts), "model": model, "done": True}
+
+    @staticmethod
+    def _batch_prompt(items: List[Dict[str, str]]) -> str:
+        """Wrap several independent prompts into one, asking for a JSON object keyed by custom_id"""
+        parts = [
+            f"You will receive {len(items)} independent requests, each between <<REQUEST id=...>> and <<END REQUEST>> markers.",
+            "Answer every request exactly as it instructs, without letting one request influence another.",
+            "Return ONLY one JSON object whose keys are the request ids and whose values are the JSON answers to those requests. No markdown, no extra text.",
+            "",
+        ]
+        for item in items:
+            parts.append(f"<<REQUEST id={item['custom_id']}>>")
+            parts.append(item["prompt"])
+            parts.append("<<END REQUEST>>")
+            parts.append("")
+        return "\n".join(parts)
+
+    @staticmethod
+    def _split_batch_response(text: str, custom_ids: List[str]) -> Dict[str, str]:
+        """Map each custom_id to the JSON text of its answer; ids the model skipped are left out"""
+        start = text.find("{")
+        end = text.rfind("}")
+        if start == -1 or end <= start:
+            return {}
+        try:
+            data = _json_loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        responses = {}
+        for cid in custom_ids:
+            answer = data.get(cid)
+            if isinstance(answer, (dict, list)):
+                responses[cid] = _json_dumps(answer).decode("utf-8")
+            elif isinstance(answer, str) and answer.strip():
+                responses[cid] = answer
+        return responses
+
+    def generate_batch(self, items: List[Dict[str, str]], model: Optional[str] = None, system_message: Optional[str] = None) -> Dict:
+        """
+        Send several independent prompts in a single chat completion
+        items: list of {"custom_id": ..., "prompt": ...}
+        Returns {"success", "responses": {custom_id: response_text}}; ids missing from the reply are absent
+        """
+        if not items:
+            return {"success": True, "responses": {}, "model": model or self.model}
+        result = self.generate(self._batch_prompt(items), model=model, system_message=system_message, json_mode=True)
+        if not result.get("success"):
+            return {"success": False, "error": result.get("error"), "responses": {}}
+        responses = self._split_batch_response(result.get("response", ""), [r["custom_id"] for r in items])
+        return {"success": True, "responses": responses, "model": result.get("model"), "raw_response": result.get("response", "")}
+
+    async def agenerate_batch(self, items: List[Dict[str, str]], model: Optional[str] = None, system_message: Optional[str] = None) -> Dict:
+        """
+        Async variant of generate_batch()
+        """
+        if not items:
+            return {"success": True, "responses": {}, "model": model or self.model}
+        result = await self.agenerate(self._batch_prompt(items), model=model, system_message=system_message, json_mode=True)
+        if not result.get("success"):
+            return {"success": False, "error": result.get("error"), "responses": {}}
+        responses = self._split_batch_response(result.get("response", ""), [r["custom_id"] for r in items])
+        return {"success": True, "responses": responses, "model": result.get("model"), "raw_response": result.get("response", "")}
+
     def check_connection(self) -> bool:
         try:
             url = f"{self.base_url}/models"
-            resp = requests.get(url, headers=self._headers(), timeout=5)
+            resp = self._session.get(url, timeout=5)
             return resp.status_code == 200
         except Exception:
             return False
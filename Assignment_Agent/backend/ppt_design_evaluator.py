@@ -1,40 +1,36 @@
 """
 PPT Design Evaluator - Evaluate PowerPoint presentation visual design using vision AI
 """
+import os
+import re
 import json
 import logging
-import base64
-import io
-from typing import Dict, List, Optional
-from pathlib import Path
+from typing import Dict, List, Optional, Union
 from .openrouter_service import OpenRouterService
+from .result_cache import ResultCache
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+_JSON_DECODER = json.JSONDecoder()
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
 
-class PPTDesignEvaluator:
-    """Evaluate PowerPoint presentation visual design based on slide images"""
-    
-    def __init__(self, openrouter_service: OpenRouterService):
-        self.openrouter_service = openrouter_service
-    
-    def build_design_evaluation_prompt_from_metadata(self, design_description: str, filename: str, total_slides: int) -> str:
-        """
-        Build the design evaluation prompt from design metadata
-        Returns prompt text for text-based AI model
-        """
-        prompt_text = f"""You are an expert presentation design evaluator. Analyze PowerPoint presentation design based on extracted design metadata.
+# Markdown code fence around a reply: skips the ```lang line and captures up to the last ```
+# (or to the end if the fence is never closed) in a single match
+_FENCE_RE = re.compile(r'\A```[^\n]*\n(.*(?=```)|.*)', re.DOTALL)
+
+# Static part of the metadata prompt. It comes first and is byte-identical across calls so providers
+# can reuse the cached prefix; the role/JSON-only instruction lives in SYSTEM_MESSAGE
+_METADATA_PROMPT_HEAD = """Analyze PowerPoint presentation design based on extracted design metadata.
 Evaluate layout, color consistency, typography, visual hierarchy, and overall visual appeal.
 Do NOT evaluate text content - only visual design aspects.
-Return ONLY valid JSON, no other text.
-
-**Presentation:** {filename}
-**Total Slides:** {total_slides}
 
-**Design Metadata:**
-{design_description}
-
-Evaluate the design and visual quality of this PowerPoint presentation based on the design metadata provided above.
+Evaluate the design and visual quality of the PowerPoint presentation whose design metadata follows the schema below.
 
 Focus on:
 - Visual clarity and readability (based on layout, shape positioning, spacing)
@@ -46,43 +42,40 @@ Focus on:
 
 Respond with ONLY this JSON (no markdown, no extra text):
 
-{{
-    "visual_clarity": {{
+{
+    "visual_clarity": {
         "score": <0-100>,
         "feedback": "<brief feedback on readability and visual clarity>"
-    }},
-    "layout_balance": {{
+    },
+    "layout_balance": {
         "score": <0-100>,
         "feedback": "<brief feedback on slide layout and spatial balance>"
-    }},
-    "color_consistency": {{
+    },
+    "color_consistency": {
         "score": <0-100>,
         "feedback": "<brief feedback on color scheme and consistency>"
-    }},
-    "typography": {{
+    },
+    "typography": {
         "score": <0-100>,
         "feedback": "<brief feedback on fonts, sizes, hierarchy>"
-    }},
-    "visual_appeal": {{
+    },
+    "visual_appeal": {
         "score": <0-100>,
         "feedback": "<brief feedback on overall visual design quality>"
-    }},
+    },
     "design_strengths": ["<strength 1>", "<strength 2>"],
     "design_improvements": ["<improvement 1>", "<improvement 2>"],
     "design_summary": "<1-2 sentence summary of design quality>"
-}}
+}
+
+The presentation to evaluate:
+
 """
-        return prompt_text
-    
-    def build_design_evaluation_prompt(self, slide_images_base64: List[str]) -> tuple[str, List[Dict]]:
-        """
-        Build the design evaluation prompt with images (legacy method - kept for backward compatibility)
-        Returns (prompt_text, messages_with_images)
-        """
-        prompt_text = """You are an expert presentation design evaluator. Analyze slide images for visual design quality.
+
+# The image prompt has no per-call text (slides follow as image parts); role/JSON-only instruction is the system message
+_IMAGE_PROMPT = """Analyze slide images for visual design quality.
 Evaluate layout, color consistency, typography, visual hierarchy, and overall visual appeal.
 Do NOT evaluate text content - only visual design aspects.
-Return ONLY valid JSON, no other text.
 
 Evaluate the design and visual quality of these PowerPoint slides.
 
@@ -122,27 +115,87 @@ Respond with ONLY this JSON (no markdown, no extra text):
     "design_summary": "<1-2 sentence summary of design quality>"
 }
 """
+
+_IMAGE_PROMPT_BLOCK = {"type": "text", "text": _IMAGE_PROMPT}
+
+# (result key, label) pairs in the order format_design_evaluation_result prints them
+_SCORE_SECTIONS = (
+    ('visual_clarity', 'Visual Clarity'),
+    ('layout_balance', 'Layout Balance'),
+    ('color_consistency', 'Color Consistency'),
+    ('typography', 'Typography'),
+    ('visual_appeal', 'Visual Appeal'),
+)
+_LIST_SECTIONS = (
+    ('design_strengths', 'Design Strengths'),
+    ('design_improvements', 'Design Improvements'),
+)
+
+
+class PPTDesignEvaluator:
+    """Evaluate PowerPoint presentation visual design based on slide images"""
+    
+    SYSTEM_MESSAGE = "You are an expert presentation design evaluator. Return ONLY valid JSON, no other text."
+    # Keys a finished design evaluation contains; a streamed reply can stop once all are present
+    REQUIRED_KEYS = ('visual_clarity', 'layout_balance', 'color_consistency', 'typography', 'visual_appeal',
+                     'design_strengths', 'design_improvements', 'design_summary')
+    
+    def __init__(self, openrouter_service: OpenRouterService):
+        self.openrouter_service = openrouter_service
+        # Design evaluations keyed by a hash of model + design metadata + filename
+        self._cache = ResultCache(int(os.getenv('PPT_EVAL_CACHE_SIZE', '256')))
+        # Stream metadata-based evaluations and stop reading once the JSON is complete
+        self.stream_responses = os.getenv('PPT_EVAL_STREAM', 'false').lower() in ('1', 'true', 'yes')
+    
+    def build_design_evaluation_prompt_from_metadata(self, design_description: str, filename: str, total_slides: int) -> str:
+        """
+        Build the design evaluation prompt from design metadata
+        Invariant instructions and schema first, per-presentation fields last
+        """
+        return "".join((
+            _METADATA_PROMPT_HEAD,
+            "**Presentation:** ", str(filename),
+            "\n**Total Slides:** ", str(total_slides),
+            "\n\n**Design Metadata:**\n", str(design_description),
+            "\n",
+        ))
+    
+    @staticmethod
+    def _image_url(image: Union[str, bytes]) -> str:
+        """
+        URL for one slide image: http(s)/data URLs pass through untouched,
+        raw PNG bytes are base64-encoded exactly once, bare base64 text is only prefixed
+        """
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            # Only the legacy image path needs base64; keep it off the metadata path's import cost
+            import base64
+            return "data:image/png;base64," + base64.b64encode(image).decode('ascii')
+        if image.startswith(('http://', 'https://', 'data:')):
+            return image
+        return "data:image/png;base64," + image
+    
+    def build_design_evaluation_prompt(self, slide_images_base64: List[Union[str, bytes]]) -> tuple[str, List[Dict]]:
+        """
+        Build the design evaluation prompt with images (legacy method - kept for backward compatibility)
+        Each slide may be base64 text, raw PNG bytes, or an image URL
+        Returns (prompt_text, messages_with_images)
+        """
+        prompt_text = _IMAGE_PROMPT
         
-        # Build messages with images for vision model
+        # Build messages with images for vision model; the static text block is shared, not copied
         messages = [
             {
                 "role": "user",
-                "content": []
+                "content": [_IMAGE_PROMPT_BLOCK]
             }
         ]
         
-        # Add text prompt
-        messages[0]["content"].append({
-            "type": "text",
-            "text": prompt_text
-        })
-        
         # Add images
-        for idx, img_base64 in enumerate(slide_images_base64, 1):
+        for image in slide_images_base64:
             messages[0]["content"].append({
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/png;base64,{img_base64}"
+                    "url": self._image_url(image)
                 }
             })
         
@@ -157,33 +210,30 @@ Respond with ONLY this JSON (no markdown, no extra text):
             # Try to find JSON in the response
             response_text = response_text.strip()
             
+            # Fast path: a bare JSON object (json_mode replies) needs no fence or brace hunting
+            if response_text.startswith('{') and response_text.endswith('}'):
+                try:
+                    return _json_loads(response_text)
+                except ValueError:
+                    pass
+            
             # Remove markdown code blocks if present
-            if response_text.startswith('```'):
-                # Find the first ``` and last ```
-                start_idx = response_text.find('```')
-                if start_idx != -1:
-                    # Check if there's a language identifier
-                    end_of_first_line = response_text.find('\n', start_idx)
-                    if end_of_first_line != -1:
-                        response_text = response_text[end_of_first_line + 1:]
-                
-                # Find the last ```
-                last_idx = response_text.rfind('```')
-                if last_idx != -1:
-                    response_text = response_text[:last_idx]
+            fence = _FENCE_RE.match(response_text)
+            if fence:
+                response_text = fence.group(1)
             
-            # Try to find JSON object boundaries
+            # Decode from the first '{'; raw_decode stops where that object ends, so trailing prose is ignored
             start_brace = response_text.find('{')
-            end_brace = response_text.rfind('}')
+            if start_brace != -1:
+                try:
+                    result, _ = _JSON_DECODER.raw_decode(response_text, start_brace)
+                    return result
+                except json.JSONDecodeError:
+                    pass
             
-            if start_brace != -1 and end_brace != -1 and end_brace > start_brace:
-                json_text = response_text[start_brace:end_brace + 1]
-                result = json.loads(json_text)
-                return result
-            else:
-                # Try parsing the whole response
-                result = json.loads(response_text)
-                return result
+            # Try parsing the whole response
+            result = _json_loads(response_text)
+            return result
                 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON from design evaluation response: {e}")
@@ -194,23 +244,82 @@ Respond with ONLY this JSON (no markdown, no extra text):
                 "raw_response": response_text[:500]
             }
     
+    def _is_complete_evaluation(self, text: str) -> bool:
+        """True once text holds a full JSON object with every required key"""
+        start = text.find('{')
+        if start == -1:
+            return False
+        try:
+            result, _ = _JSON_DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            return False
+        return isinstance(result, dict) and all(key in result for key in self.REQUIRED_KEYS)
+    
+    def _check_design_metadata(self, design_description: str, filename: str) -> Optional[Dict]:
+        """
+        Return an error result if the design metadata cannot be evaluated, else None
+        """
+        if not design_description or design_description.strip().startswith('['):
+            # Check if it's an error message
+            if design_description and design_description.strip().startswith('['):
+                return {
+                    "error": design_description.strip('[]'),
+                    "filename": filename
+                }
+            return {
+                "error": "No design metadata provided for design evaluation",
+                "filename": filename
+            }
+        return None
+    
+    def _design_cache_key(self, design_description: str, filename: str, total_slides: int) -> str:
+        # Model is part of the key so a model change does not serve stale evaluations
+        return ResultCache.make_key(self.openrouter_service.model, design_description, filename, total_slides)
+    
+    def _finish_design_evaluation(self, result: Dict, filename: str, total_slides: int, cache_key: Optional[str] = None) -> Dict:
+        """
+        Turn a generate() result into a design evaluation result for one file
+        Successful results are cached under cache_key when given
+        """
+        if not result.get("success"):
+            return {
+                "error": result.get("error", "No response from AI service"),
+                "filename": filename
+            }
+        
+        response_text = result.get("response", "")
+        if not response_text:
+            return {
+                "error": "Empty response from AI service",
+                "filename": filename
+            }
+        
+        # Parse response
+        evaluation_result = self.parse_design_evaluation_response(response_text)
+        
+        # Add metadata
+        evaluation_result['filename'] = filename
+        evaluation_result['total_slides_analyzed'] = total_slides
+        
+        if cache_key and 'error' not in evaluation_result:
+            self._cache.put(cache_key, evaluation_result)
+        
+        return evaluation_result
+    
     def evaluate_design_from_metadata(self, design_description: str, filename: str, total_slides: int) -> Dict:
         """
         Evaluate design of PPT slides using design metadata (no PowerPoint required)
         design_description: Text description of design metadata extracted from PPTX
         """
         try:
-            if not design_description or design_description.strip().startswith('['):
-                # Check if it's an error message
-                if design_description and design_description.strip().startswith('['):
-                    return {
-                        "error": design_description.strip('[]'),
-                        "filename": filename
-                    }
-                return {
-                    "error": "No design metadata provided for design evaluation",
-                    "filename": filename
-                }
+            error_result = self._check_design_metadata(design_description, filename)
+            if error_result:
+                return error_result
+            
+            cache_key = self._design_cache_key(design_description, filename, total_slides)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
             
             # Build prompt from metadata
             prompt_text = self.build_design_evaluation_prompt_from_metadata(
@@ -218,32 +327,57 @@ Respond with ONLY this JSON (no markdown, no extra text):
             )
             
             # Call OpenRouter service with regular text model (no vision needed)
-            result = self.openrouter_service.generate(
-                prompt=prompt_text,
-                system_message="You are an expert presentation design evaluator. Return ONLY valid JSON, no other text."
-            )
+            if self.stream_responses:
+                result = self.openrouter_service.generate_stream(
+                    prompt_text, system_message=self.SYSTEM_MESSAGE, stop_when=self._is_complete_evaluation,
+                    json_mode=True
+                )
+            else:
+                result = self.openrouter_service.generate(
+                    prompt=prompt_text,
+                    system_message=self.SYSTEM_MESSAGE,
+                    json_mode=True
+                )
             
-            if not result.get("success"):
-                return {
-                    "error": result.get("error", "No response from AI service"),
-                    "filename": filename
-                }
+            return self._finish_design_evaluation(result, filename, total_slides, cache_key)
             
-            response_text = result.get("response", "")
-            if not response_text:
-                return {
-                    "error": "Empty response from AI service",
-                    "filename": filename
-                }
+        except Exception as e:
+            logger.error(f"Error evaluating PPT design from metadata: {e}", exc_info=True)
+            return {
+                "error": f"Error during design evaluation: {str(e)}",
+                "filename": filename
+            }
+    
+    async def aevaluate_design_from_metadata(self, design_description: str, filename: str, total_slides: int) -> Dict:
+        """
+        Async variant of evaluate_design_from_metadata for use from async endpoints
+        """
+        try:
+            error_result = self._check_design_metadata(design_description, filename)
+            if error_result:
+                return error_result
             
-            # Parse response
-            evaluation_result = self.parse_design_evaluation_response(response_text)
+            cache_key = self._design_cache_key(design_description, filename, total_slides)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Add metadata
-            evaluation_result['filename'] = filename
-            evaluation_result['total_slides_analyzed'] = total_slides
+            prompt_text = self.build_design_evaluation_prompt_from_metadata(
+                design_description, filename, total_slides
+            )
+            if self.stream_responses:
+                result = await self.openrouter_service.agenerate_stream(
+                    prompt_text, system_message=self.SYSTEM_MESSAGE, stop_when=self._is_complete_evaluation,
+                    json_mode=True
+                )
+            else:
+                result = await self.openrouter_service.agenerate(
+                    prompt=prompt_text,
+                    system_message=self.SYSTEM_MESSAGE,
+                    json_mode=True
+                )
             
-            return evaluation_result
+            return self._finish_design_evaluation(result, filename, total_slides, cache_key)
             
         except Exception as e:
             logger.error(f"Error evaluating PPT design from metadata: {e}", exc_info=True)
@@ -252,10 +386,10 @@ Respond with ONLY this JSON (no markdown, no extra text):
                 "filename": filename
             }
     
-    def evaluate_design(self, slide_images_base64: List[str], filename: str) -> Dict:
+    def evaluate_design(self, slide_images_base64: List[Union[str, bytes]], filename: str) -> Dict:
         """
         Evaluate design of PPT slides using vision AI (legacy method - kept for backward compatibility)
-        slide_images_base64: List of base64-encoded PNG images (one per slide)
+        slide_images_base64: one image per slide, as base64-encoded PNG text, raw PNG bytes, or an image URL
         """
         try:
             if not slide_images_base64:
@@ -264,19 +398,19 @@ Respond with ONLY this JSON (no markdown, no extra text):
                     "filename": filename
                 }
             
-            # Build prompt with images
-            prompt_text, messages = self.build_design_evaluation_prompt(slide_images_base64)
-            
             # Call OpenRouter service with vision model
             # Use a vision-capable model (check if model supports vision)
             vision_model = self.openrouter_service.model
             # Common vision models: gpt-4-vision-preview, claude-3-opus, etc.
             # For now, try with the configured model - OpenRouter should handle vision if model supports it
             
-            # Use the generate_with_images method if available, otherwise use generate
+            # Pass a builder rather than the messages: the service serializes them and drops the
+            # data-URL strings, which a list held here would keep alive for the whole request
             result = self.openrouter_service.generate_with_images(
-                messages=messages,
-                model=vision_model
+                messages=lambda: self.build_design_evaluation_prompt(slide_images_base64)[1],
+                model=vision_model,
+                system_message=self.SYSTEM_MESSAGE,
+                json_mode=True
             )
             
             if not result.get("success"):
@@ -315,63 +449,22 @@ Respond with ONLY this JSON (no markdown, no extra text):
         if "error" in evaluation_result:
             return f"Error: {evaluation_result.get('error', 'Unknown error')}"
         
-        parts = []
-        parts.append(f"File: {evaluation_result.get('filename', 'Unknown')}")
-        parts.append(f"Slides Analyzed: {evaluation_result.get('total_slides_analyzed', 0)}")
-        parts.append("")
-        
-        # Visual Clarity
-        if "visual_clarity" in evaluation_result:
-            vc = evaluation_result["visual_clarity"]
-            parts.append(f"Visual Clarity Score: {vc.get('score', 'N/A')}/100")
-            parts.append(f"Feedback: {vc.get('feedback', 'N/A')}")
-            parts.append("")
-        
-        # Layout Balance
-        if "layout_balance" in evaluation_result:
-            lb = evaluation_result["layout_balance"]
-            parts.append(f"Layout Balance Score: {lb.get('score', 'N/A')}/100")
-            parts.append(f"Feedback: {lb.get('feedback', 'N/A')}")
-            parts.append("")
+        # Every line is written with its newline; the final one is trimmed on return
+        out = [f"File: {evaluation_result.get('filename', 'Unknown')}\nSlides Analyzed: {evaluation_result.get('total_slides_analyzed', 0)}\n\n"]
         
-        # Color Consistency
-        if "color_consistency" in evaluation_result:
-            cc = evaluation_result["color_consistency"]
-            parts.append(f"Color Consistency Score: {cc.get('score', 'N/A')}/100")
-            parts.append(f"Feedback: {cc.get('feedback', 'N/A')}")
-            parts.append("")
+        for key, label in _SCORE_SECTIONS:
+            if key in evaluation_result:
+                section = evaluation_result[key]
+                out.append(f"{label} Score: {section.get('score', 'N/A')}/100\nFeedback: {section.get('feedback', 'N/A')}\n\n")
         
-        # Typography
-        if "typography" in evaluation_result:
-            typo = evaluation_result["typography"]
-            parts.append(f"Typography Score: {typo.get('score', 'N/A')}/100")
-            parts.append(f"Feedback: {typo.get('feedback', 'N/A')}")
-            parts.append("")
-        
-        # Visual Appeal
-        if "visual_appeal" in evaluation_result:
-            va = evaluation_result["visual_appeal"]
-            parts.append(f"Visual Appeal Score: {va.get('score', 'N/A')}/100")
-            parts.append(f"Feedback: {va.get('feedback', 'N/A')}")
-            parts.append("")
-        
-        # Design Strengths
-        if "design_strengths" in evaluation_result:
-            parts.append("Design Strengths:")
-            for strength in evaluation_result["design_strengths"]:
-                parts.append(f"  - {strength}")
-            parts.append("")
-        
-        # Design Improvements
-        if "design_improvements" in evaluation_result:
-            parts.append("Design Improvements:")
-            for improvement in evaluation_result["design_improvements"]:
-                parts.append(f"  - {improvement}")
-            parts.append("")
+        for key, label in _LIST_SECTIONS:
+            if key in evaluation_result:
+                out.append(f"{label}:\n")
+                out.extend(f"  - {item}\n" for item in evaluation_result[key])
+                out.append("\n")
         
         # Design Summary
         if "design_summary" in evaluation_result:
-            parts.append(f"Design Summary: {evaluation_result['design_summary']}")
+            out.append(f"Design Summary: {evaluation_result['design_summary']}\n")
         
-        return "\n".join(parts)
-
+        return "".join(out)[:-1]
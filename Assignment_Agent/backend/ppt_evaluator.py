@@ -1,60 +1,152 @@
 """
 PPT Evaluator - Evaluate PowerPoint presentations using AI
 """
+import os
+import re
 import json
+import asyncio
 import logging
 from typing import Dict, List, Optional
 from .openrouter_service import OpenRouterService
+from .result_cache import ResultCache
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+_JSON_DECODER = json.JSONDecoder()
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
 
-class PPTEvaluator:
-    """Evaluate PowerPoint presentations based on text content and structure"""
-    
-    def __init__(self, openrouter_service: OpenRouterService):
-        self.openrouter_service = openrouter_service
-    
-    def build_evaluation_prompt(self, title: str, description: str, total_slides: int, slides_text: str) -> str:
-        """
-        Build the evaluation prompt for PPT files
-        Uses the specific template provided
-        """
-        prompt = f"""You are an expert presentation evaluator. Analyze PowerPoint presentations based on their text content and structure.
-Evaluate ONLY based on the text content provided - do NOT evaluate design or visuals.
-Return ONLY valid JSON, no other text.
+# Markdown code fence around a reply: skips the ```lang line and captures up to the last ```
+# (or to the end if the fence is never closed) in a single match
+_FENCE_RE = re.compile(r'\A```[^\n]*\n(.*(?=```)|.*)', re.DOTALL)
 
-Evaluate this PowerPoint presentation on text content, structure, and title alignment.
+# Placeholders the PPT processor emits instead of slide text when extraction fails
+ERROR_INDICATORS = (
+    '[python-pptx library not available',
+    '[Error reading PPTX file',
+    '[Error reading PPT file',
+    '[Error opening PowerPoint',
+    '[comtypes library not available',
+    '[Unsupported PowerPoint format',
+)
+# One alternation scans the slide text once instead of once per indicator
+_ERROR_INDICATOR_RE = re.compile('|'.join(map(re.escape, ERROR_INDICATORS)))
 
-**Presentation Metadata:**
-- Title: {title}
-- Description: {description}
-- Total Slides: {total_slides}
+# Header line ppt_processor writes at the start of every slide block
+_SLIDE_HEADER_RE = re.compile(r'^--- Slide \d+ ---$')
 
-**Slide Content:**
-{slides_text}
+
+def _normalize_slides(slides_text: str) -> str:
+    """
+    Shrink extracted slide text before it goes into the prompt
+    Collapses whitespace runs, drops blank and consecutive duplicate lines,
+    and drops slides with fewer than 3 non-whitespace characters of content
+    """
+    blocks = []
+    current = []
+    prev = None
+    for raw_line in slides_text.splitlines():
+        line = ' '.join(raw_line.split())
+        if not line or line == prev:
+            continue
+        prev = line
+        if current and _SLIDE_HEADER_RE.match(line):
+            blocks.append(current)
+            current = []
+        current.append(line)
+    if current:
+        blocks.append(current)
+    
+    kept = [
+        block for block in blocks
+        if not _SLIDE_HEADER_RE.match(block[0]) or sum(len(line) - line.count(' ') for line in block[1:]) >= 3
+    ]
+    if not kept:
+        return slides_text.strip()
+    return "\n\n".join("\n".join(block) for block in kept)
+
+# (result key, label) pairs in the order format_evaluation_result prints them
+_SCORE_SECTIONS = (
+    ('content_quality', 'Content Quality'),
+    ('structure', 'Structure'),
+    ('alignment', 'Alignment'),
+)
+_LIST_SECTIONS = (
+    ('strengths', 'Strengths'),
+    ('improvements', 'Areas for Improvement'),
+)
+
+# Static part of the evaluation prompt. It comes first and is byte-identical across calls so providers
+# can reuse the cached prefix; the role/JSON-only instruction lives in SYSTEM_MESSAGE
+_PROMPT_HEAD = """Analyze this PowerPoint presentation based on its text content and structure.
+Evaluate ONLY based on the text content provided - do NOT evaluate design or visuals.
+Evaluate it on text content, structure, and title alignment.
 
 Evaluate across these criteria and respond with ONLY this JSON (no markdown, no extra text):
 
-{{
-    "content_quality": {{
+{
+    "content_quality": {
         "score": <0-100>,
         "feedback": "<2-3 sentence feedback on accuracy, relevance, depth, research quality>"
-    }},
-    "structure": {{
+    },
+    "structure": {
         "score": <0-100>,
         "feedback": "<2-3 sentence feedback on logical flow, hierarchy, transitions, organization>"
-    }},
-    "alignment": {{
+    },
+    "alignment": {
         "score": <0-100>,
         "feedback": "<2-3 sentence feedback on how well content matches title and description>"
-    }},
+    },
     "strengths": ["<strength 1>", "<strength 2>", "<strength 3>"],
     "improvements": ["<improvement 1>", "<improvement 2>", "<improvement 3>"],
     "summary": "<1-2 sentence overall summary>"
-}}
+}
+
+The presentation to evaluate:
+
+**Presentation Metadata:**
 """
-        return prompt
+
+
+class PPTEvaluator:
+    """Evaluate PowerPoint presentations based on text content and structure"""
+    
+    SYSTEM_MESSAGE = "You are an expert presentation evaluator. Return ONLY valid JSON, no other text."
+    # Keys a finished evaluation contains; a streamed reply can stop once all are present
+    REQUIRED_KEYS = ('content_quality', 'structure', 'alignment', 'strengths', 'improvements', 'summary')
+    
+    def __init__(self, openrouter_service: OpenRouterService):
+        self.openrouter_service = openrouter_service
+        # Limits for packing several presentations into one request
+        self.batch_max_chars = int(os.getenv('PPT_BATCH_MAX_CHARS', '48000'))
+        self.batch_max_files = int(os.getenv('PPT_BATCH_MAX_FILES', '8'))
+        # Max concurrent LLM requests in the async evaluation path
+        self.max_concurrency = int(os.getenv('PPT_EVAL_CONCURRENCY', '10'))
+        # Delay between starting concurrent workers so they don't all hit the API in lockstep
+        self.stagger_ms = int(os.getenv('PPT_EVAL_STAGGER_MS', '100'))
+        # Evaluations keyed by a hash of model + title + description + slide text
+        self._cache = ResultCache(int(os.getenv('PPT_EVAL_CACHE_SIZE', '256')))
+        # Stream single-file evaluations and stop reading once the JSON is complete
+        self.stream_responses = os.getenv('PPT_EVAL_STREAM', 'false').lower() in ('1', 'true', 'yes')
+    
+    def build_evaluation_prompt(self, title: str, description: str, total_slides: int, slides_text: str) -> str:
+        """
+        Build the evaluation prompt for PPT files
+        Invariant instructions and schema first, per-presentation fields last
+        """
+        return "".join((
+            _PROMPT_HEAD,
+            "- Title: ", str(title),
+            "\n- Description: ", str(description),
+            "\n- Total Slides: ", str(total_slides),
+            "\n\n**Slide Content:**\n", _normalize_slides(str(slides_text)),
+            "\n",
+        ))
     
     def parse_evaluation_response(self, response_text: str) -> Dict:
         """
@@ -65,33 +157,30 @@ Evaluate across these criteria and respond with ONLY this JSON (no markdown, no
             # Try to find JSON in the response
             response_text = response_text.strip()
             
+            # Fast path: a bare JSON object (json_mode replies) needs no fence or brace hunting
+            if response_text.startswith('{') and response_text.endswith('}'):
+                try:
+                    return _json_loads(response_text)
+                except ValueError:
+                    pass
+            
             # Remove markdown code blocks if present
-            if response_text.startswith('```'):
-                # Find the first ``` and last ```
-                start_idx = response_text.find('```')
-                if start_idx != -1:
-                    # Check if there's a language identifier
-                    end_of_first_line = response_text.find('\n', start_idx)
-                    if end_of_first_line != -1:
-                        response_text = response_text[end_of_first_line + 1:]
-                
-                # Find the last ```
-                last_idx = response_text.rfind('```')
-                if last_idx != -1:
-                    response_text = response_text[:last_idx]
+            fence = _FENCE_RE.match(response_text)
+            if fence:
+                response_text = fence.group(1)
             
-            # Try to find JSON object boundaries
+            # Decode from the first '{'; raw_decode stops where that object ends, so trailing prose is ignored
             start_brace = response_text.find('{')
-            end_brace = response_text.rfind('}')
+            if start_brace != -1:
+                try:
+                    result, _ = _JSON_DECODER.raw_decode(response_text, start_brace)
+                    return result
+                except json.JSONDecodeError:
+                    pass
             
-            if start_brace != -1 and end_brace != -1 and end_brace > start_brace:
-                json_text = response_text[start_brace:end_brace + 1]
-                result = json.loads(json_text)
-                return result
-            else:
-                # Try parsing the whole response
-                result = json.loads(response_text)
-                return result
+            # Try parsing the whole response
+            result = _json_loads(response_text)
+            return result
                 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON from response: {e}")
@@ -102,48 +191,122 @@ Evaluate across these criteria and respond with ONLY this JSON (no markdown, no
                 "raw_response": response_text[:500]
             }
     
+    def _is_complete_evaluation(self, text: str) -> bool:
+        """True once text holds a full JSON object with every required key"""
+        start = text.find('{')
+        if start == -1:
+            return False
+        try:
+            result, _ = _JSON_DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            return False
+        return isinstance(result, dict) and all(key in result for key in self.REQUIRED_KEYS)
+    
+    def _generate(self, prompt: str) -> Dict:
+        if self.stream_responses:
+            return self.openrouter_service.generate_stream(
+                prompt, system_message=self.SYSTEM_MESSAGE, stop_when=self._is_complete_evaluation,
+                json_mode=True
+            )
+        return self.openrouter_service.generate(prompt, system_message=self.SYSTEM_MESSAGE, json_mode=True)
+    
+    async def _agenerate(self, prompt: str) -> Dict:
+        if self.stream_responses:
+            return await self.openrouter_service.agenerate_stream(
+                prompt, system_message=self.SYSTEM_MESSAGE, stop_when=self._is_complete_evaluation,
+                json_mode=True
+            )
+        return await self.openrouter_service.agenerate(prompt, system_message=self.SYSTEM_MESSAGE, json_mode=True)
+    
+    def _check_ppt_data(self, ppt_data: Dict[str, any]) -> Optional[Dict]:
+        """
+        Return an error result if ppt_data cannot be evaluated, else None
+        """
+        slides_text = ppt_data.get('slides_text', '')
+        total_slides = ppt_data.get('total_slides', 0)
+        filename = ppt_data.get('filename', 'Unknown')
+        
+        # Check for actual errors (library not available, reading errors)
+        is_error = _ERROR_INDICATOR_RE.search(slides_text) is not None
+        
+        if not slides_text or is_error:
+            error_msg = slides_text if is_error else "No text content extracted"
+            return {
+                "error": f"Could not extract text from PPT file: {filename}. {error_msg}",
+                "filename": filename
+            }
+        
+        # Allow "[No text content found in slides]" - this is valid (empty slides)
+        # but we should still try to evaluate if there are slides
+        if total_slides == 0 and "[No text content found in slides]" in slides_text:
+            return {
+                "error": f"PPT file {filename} has no slides or no extractable text content",
+                "filename": filename
+            }
+        return None
+    
+    def _cache_key(self, title: str, description: str, ppt_data: Dict[str, any]) -> str:
+        # Model is part of the key so a model change does not serve stale evaluations
+        return ResultCache.make_key(
+            self.openrouter_service.model, title, description,
+            ppt_data.get('total_slides', 0), ppt_data.get('slides_text', '')
+        )
+    
+    def _cached_evaluation(self, cache_key: str, ppt_data: Dict[str, any]) -> Optional[Dict]:
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            # Identical content may arrive under another name
+            cached['filename'] = ppt_data.get('filename', 'Unknown')
+        return cached
+    
+    def _finish_evaluation(self, response_text: str, filename: str, total_slides: int, cache_key: Optional[str] = None) -> Dict:
+        """
+        Parse a model response into an evaluation result for one file
+        Successful results are cached under cache_key when given
+        """
+        if not response_text:
+            return {
+                "error": "Empty response from AI service",
+                "filename": filename
+            }
+        
+        # Parse response
+        evaluation_result = self.parse_evaluation_response(response_text)
+        
+        # Add filename to result
+        evaluation_result['filename'] = filename
+        evaluation_result['total_slides'] = total_slides
+        
+        if cache_key and 'error' not in evaluation_result:
+            self._cache.put(cache_key, evaluation_result)
+        
+        return evaluation_result
+    
     def evaluate_ppt(self, title: str, description: str, ppt_data: Dict[str, any]) -> Dict:
         """
         Evaluate a single PPT file
         ppt_data should contain: slides_text, total_slides, filename
         """
         try:
+            error_result = self._check_ppt_data(ppt_data)
+            if error_result:
+                return error_result
+            
+            # Re-grading the same content is served from the cache
+            cache_key = self._cache_key(title, description, ppt_data)
+            cached = self._cached_evaluation(cache_key, ppt_data)
+            if cached is not None:
+                return cached
+            
             slides_text = ppt_data.get('slides_text', '')
             total_slides = ppt_data.get('total_slides', 0)
             filename = ppt_data.get('filename', 'Unknown')
             
-            # Check for actual errors (library not available, reading errors)
-            error_indicators = [
-                '[python-pptx library not available',
-                '[Error reading PPTX file',
-                '[Error reading PPT file',
-                '[Error opening PowerPoint',
-                '[comtypes library not available',
-                '[Unsupported PowerPoint format'
-            ]
-            
-            is_error = any(indicator in slides_text for indicator in error_indicators)
-            
-            if not slides_text or is_error:
-                error_msg = slides_text if is_error else "No text content extracted"
-                return {
-                    "error": f"Could not extract text from PPT file: {filename}. {error_msg}",
-                    "filename": filename
-                }
-            
-            # Allow "[No text content found in slides]" - this is valid (empty slides)
-            # but we should still try to evaluate if there are slides
-            if total_slides == 0 and "[No text content found in slides]" in slides_text:
-                return {
-                    "error": f"PPT file {filename} has no slides or no extractable text content",
-                    "filename": filename
-                }
-            
             # Build prompt
             prompt = self.build_evaluation_prompt(title, description, total_slides, slides_text)
             
             # Call OpenRouter service
-            result = self.openrouter_service.generate(prompt, system_message="You are an expert presentation evaluator. Return ONLY valid JSON, no other text.")
+            result = self._generate(prompt)
             
             if not result.get("success"):
                 return {
@@ -151,21 +314,135 @@ Evaluate across these criteria and respond with ONLY this JSON (no markdown, no
                     "filename": filename
                 }
             
-            response_text = result.get("response", "")
-            if not response_text:
+            return self._finish_evaluation(result.get("response", ""), filename, total_slides, cache_key)
+            
+        except Exception as e:
+            logger.error(f"Error evaluating PPT: {e}", exc_info=True)
+            return {
+                "error": f"Error during evaluation: {str(e)}",
+                "filename": ppt_data.get('filename', 'Unknown')
+            }
+    
+    def _pack_batches(self, ppt_files_data: List[Dict[str, any]], indices: List[int]) -> List[List[int]]:
+        """
+        Group file indices into batches bounded by slide-text size and file count
+        """
+        batches = []
+        current = []
+        current_chars = 0
+        for i in indices:
+            size = len(ppt_files_data[i].get('slides_text', ''))
+            if current and (current_chars + size > self.batch_max_chars or len(current) >= self.batch_max_files):
+                batches.append(current)
+                current = []
+                current_chars = 0
+            current.append(i)
+            current_chars += size
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _batch_items(self, title: str, description: str, ppt_files_data: List[Dict[str, any]], batch: List[int]) -> List[Dict[str, str]]:
+        items = []
+        for i in batch:
+            ppt_data = ppt_files_data[i]
+            items.append({
+                "custom_id": f"deck_{i + 1}",
+                "prompt": self.build_evaluation_prompt(
+                    title, description, ppt_data.get('total_slides', 0), ppt_data.get('slides_text', '')
+                ),
+            })
+        return items
+    
+    def _apply_batch_result(self, title: str, description: str, result: Dict, ppt_files_data: List[Dict[str, any]],
+                            batch: List[int], items: List[Dict[str, str]], evaluations: List[Optional[Dict]]) -> List[int]:
+        """
+        Store the evaluations a batched reply covers; return the indices that need an individual retry
+        """
+        if not result.get("success"):
+            logger.warning(f"Batched PPT evaluation failed, evaluating {len(batch)} files individually: {result.get('error')}")
+            return list(batch)
+        responses = result.get("responses", {})
+        retry = []
+        for i, item in zip(batch, items):
+            ppt_data = ppt_files_data[i]
+            response_text = responses.get(item["custom_id"])
+            evaluation = None
+            if response_text:
+                evaluation = self._finish_evaluation(
+                    response_text, ppt_data.get('filename', 'Unknown'), ppt_data.get('total_slides', 0),
+                    self._cache_key(title, description, ppt_data)
+                )
+            if evaluation is None or 'error' in evaluation:
+                retry.append(i)
+            else:
+                evaluations[i] = evaluation
+        return retry
+    
+    def _pending_evaluations(self, title: str, description: str, ppt_files_data: List[Dict[str, any]]):
+        """Pre-check every file; returns (evaluations with errors and cache hits filled in, indices still to evaluate)"""
+        evaluations: List[Optional[Dict]] = [None] * len(ppt_files_data)
+        pending = []
+        for i, ppt_data in enumerate(ppt_files_data):
+            error_result = self._check_ppt_data(ppt_data)
+            if error_result:
+                evaluations[i] = error_result
+                continue
+            cached = self._cached_evaluation(self._cache_key(title, description, ppt_data), ppt_data)
+            if cached is not None:
+                evaluations[i] = cached
+            else:
+                pending.append(i)
+        return evaluations, pending
+    
+    def evaluate_ppts_batched(self, title: str, description: str, ppt_files_data: List[Dict[str, any]]) -> List[Dict]:
+        """
+        Evaluate several PPT files, packing their prompts into shared requests
+        Files the batched reply does not cover are re-evaluated individually
+        Returns one evaluation per input, in input order
+        """
+        evaluations, pending = self._pending_evaluations(title, description, ppt_files_data)
+        
+        for batch in self._pack_batches(ppt_files_data, pending):
+            if len(batch) == 1:
+                # Nothing to share a request with
+                retry = batch
+            else:
+                items = self._batch_items(title, description, ppt_files_data, batch)
+                result = self.openrouter_service.generate_batch(items, system_message=self.SYSTEM_MESSAGE)
+                retry = self._apply_batch_result(title, description, result, ppt_files_data, batch, items, evaluations)
+            for i in retry:
+                evaluations[i] = self.evaluate_ppt(title, description, ppt_files_data[i])
+        
+        return evaluations
+    
+    async def aevaluate_ppt(self, title: str, description: str, ppt_data: Dict[str, any]) -> Dict:
+        """
+        Async variant of evaluate_ppt
+        """
+        try:
+            error_result = self._check_ppt_data(ppt_data)
+            if error_result:
+                return error_result
+            
+            cache_key = self._cache_key(title, description, ppt_data)
+            cached = self._cached_evaluation(cache_key, ppt_data)
+            if cached is not None:
+                return cached
+            
+            total_slides = ppt_data.get('total_slides', 0)
+            filename = ppt_data.get('filename', 'Unknown')
+            prompt = self.build_evaluation_prompt(title, description, total_slides, ppt_data.get('slides_text', ''))
+            
+            result = await self._agenerate(prompt)
+            
+            if not result.get("success"):
                 return {
-                    "error": "Empty response from AI service",
+                    "error": result.get("error", "No response from AI service"),
                     "filename": filename
                 }
             
-            # Parse response
-            evaluation_result = self.parse_evaluation_response(response_text)
-            
-            # Add filename to result
-            evaluation_result['filename'] = filename
-            evaluation_result['total_slides'] = total_slides
-            
-            return evaluation_result
+            return self._finish_evaluation(result.get("response", ""), filename, total_slides, cache_key)
             
         except Exception as e:
             logger.error(f"Error evaluating PPT: {e}", exc_info=True)
@@ -174,22 +451,58 @@ Evaluate across these criteria and respond with ONLY this JSON (no markdown, no
                 "filename": ppt_data.get('filename', 'Unknown')
             }
     
+    async def stagger(self, slot: int) -> None:
+        """Delay the slot-th concurrent worker so the first wave of requests is spread out"""
+        # Slots beyond the concurrency limit already wait on the semaphore, so cap the delay
+        if self.stagger_ms > 0 and slot > 0:
+            await asyncio.sleep(min(slot, self.max_concurrency - 1) * self.stagger_ms / 1000)
+    
+    async def aevaluate_ppts_batched(self, title: str, description: str, ppt_files_data: List[Dict[str, any]]) -> List[Dict]:
+        """
+        Async variant of evaluate_ppts_batched
+        Batches (and individual retries) run concurrently, at most max_concurrency requests at a time
+        """
+        evaluations, pending = self._pending_evaluations(title, description, ppt_files_data)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def evaluate_one(i: int):
+            async with semaphore:
+                evaluations[i] = await self.aevaluate_ppt(title, description, ppt_files_data[i])
+        
+        async def evaluate_batch(slot: int, batch: List[int]):
+            await self.stagger(slot)
+            if len(batch) == 1:
+                retry = batch
+            else:
+                items = self._batch_items(title, description, ppt_files_data, batch)
+                async with semaphore:
+                    result = await self.openrouter_service.agenerate_batch(items, system_message=self.SYSTEM_MESSAGE)
+                retry = self._apply_batch_result(title, description, result, ppt_files_data, batch, items, evaluations)
+            await asyncio.gather(*(evaluate_one(i) for i in retry))
+        
+        await asyncio.gather(*(evaluate_batch(slot, batch) for slot, batch in enumerate(self._pack_batches(ppt_files_data, pending))))
+        return evaluations
+    
     def evaluate_multiple_ppts(self, title: str, description: str, ppt_files_data: List[Dict[str, any]]) -> Dict:
         """
         Evaluate multiple PPT files
         Returns a dict with results for each file
         """
-        results = {
+        return {
             "title": title,
             "description": description,
-            "evaluations": []
+            "evaluations": self.evaluate_ppts_batched(title, description, ppt_files_data)
+        }
+    
+    async def aevaluate_multiple_ppts(self, title: str, description: str, ppt_files_data: List[Dict[str, any]]) -> Dict:
+        """
+        Async variant of evaluate_multiple_ppts for use from async endpoints
+        """
+        return {
+            "title": title,
+            "description": description,
+            "evaluations": await self.aevaluate_ppts_batched(title, description, ppt_files_data)
         }
-        
-        for ppt_data in ppt_files_data:
-            evaluation = self.evaluate_ppt(title, description, ppt_data)
-            results["evaluations"].append(evaluation)
-        
-        return results
     
     def format_evaluation_result(self, evaluation_result: Dict) -> str:
         """
@@ -198,49 +511,22 @@ Evaluate across these criteria and respond with ONLY this JSON (no markdown, no
         if "error" in evaluation_result:
             return f"Error: {evaluation_result.get('error', 'Unknown error')}"
         
-        parts = []
-        parts.append(f"File: {evaluation_result.get('filename', 'Unknown')}")
-        parts.append(f"Total Slides: {evaluation_result.get('total_slides', 0)}")
-        parts.append("")
-        
-        # Content Quality
-        if "content_quality" in evaluation_result:
-            cq = evaluation_result["content_quality"]
-            parts.append(f"Content Quality Score: {cq.get('score', 'N/A')}/100")
-            parts.append(f"Feedback: {cq.get('feedback', 'N/A')}")
-            parts.append("")
-        
-        # Structure
-        if "structure" in evaluation_result:
-            struct = evaluation_result["structure"]
-            parts.append(f"Structure Score: {struct.get('score', 'N/A')}/100")
-            parts.append(f"Feedback: {struct.get('feedback', 'N/A')}")
-            parts.append("")
-        
-        # Alignment
-        if "alignment" in evaluation_result:
-            align = evaluation_result["alignment"]
-            parts.append(f"Alignment Score: {align.get('score', 'N/A')}/100")
-            parts.append(f"Feedback: {align.get('feedback', 'N/A')}")
-            parts.append("")
-        
-        # Strengths
-        if "strengths" in evaluation_result:
-            parts.append("Strengths:")
-            for strength in evaluation_result["strengths"]:
-                parts.append(f"  - {strength}")
-            parts.append("")
-        
-        # Improvements
-        if "improvements" in evaluation_result:
-            parts.append("Areas for Improvement:")
-            for improvement in evaluation_result["improvements"]:
-                parts.append(f"  - {improvement}")
-            parts.append("")
+        # Every line is written with its newline; the final one is trimmed on return
+        out = [f"File: {evaluation_result.get('filename', 'Unknown')}\nTotal Slides: {evaluation_result.get('total_slides', 0)}\n\n"]
+        
+        for key, label in _SCORE_SECTIONS:
+            if key in evaluation_result:
+                section = evaluation_result[key]
+                out.append(f"{label} Score: {section.get('score', 'N/A')}/100\nFeedback: {section.get('feedback', 'N/A')}\n\n")
+        
+        for key, label in _LIST_SECTIONS:
+            if key in evaluation_result:
+                out.append(f"{label}:\n")
+                out.extend(f"  - {item}\n" for item in evaluation_result[key])
+                out.append("\n")
         
         # Summary
         if "summary" in evaluation_result:
-            parts.append(f"Summary: {evaluation_result['summary']}")
+            out.append(f"Summary: {evaluation_result['summary']}\n")
         
-        return "\n".join(parts)
-
+        return "".join(out)[:-1]
@@ -2,20 +2,47 @@
 PPT Processor - Extract text content from PowerPoint files
 """
 import os
+import io
 import base64
+import logging
+import posixpath
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 # Optional import for PPTX processing
 try:
     from pptx import Presentation
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
     PPTX_AVAILABLE = True
+    
+    # shape_type buckets for design extraction; placeholders (and shapes python-pptx can't type)
+    # may hold a picture, table or shape, so those are still probed by attribute
+    _PICTURE_SHAPE_TYPES = (MSO_SHAPE_TYPE.PICTURE, MSO_SHAPE_TYPE.LINKED_PICTURE)
+    _AUTO_SHAPE_TYPES = (MSO_SHAPE_TYPE.AUTO_SHAPE, MSO_SHAPE_TYPE.TEXT_BOX)
+    _PROBED_SHAPE_TYPES = (MSO_SHAPE_TYPE.PLACEHOLDER, None)
 except ImportError:
     PPTX_AVAILABLE = False
-    import logging
-    logger = logging.getLogger(__name__)
     logger.warning("python-pptx library not available. Install with: pip install python-pptx")
 
+# Optional import for the fast text path (python-pptx itself depends on lxml)
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+    
+    # Uploaded decks are untrusted: never expand entities or fetch external resources
+    # (same settings as python-pptx's own oxml parser; lxml < 5 resolves entities by default)
+    _XML_PARSER_OPTIONS = {'resolve_entities': False, 'no_network': True}
+    _XML_PARSER = etree.XMLParser(**_XML_PARSER_OPTIONS)
+except ImportError:
+    LXML_AVAILABLE = False
+
 # Optional import for legacy PPT files (requires comtypes on Windows)
 try:
     import comtypes.client
@@ -23,6 +50,82 @@ try:
 except ImportError:
     COMTYPES_AVAILABLE = False
 
+# Early-bound PowerPoint interfaces (vtable calls instead of IDispatch name lookups per property);
+# generated once from PowerPoint's type library, late binding is used if it is not registered
+POWERPOINT_TYPELIB = ('{91493440-5A91-11CF-8700-00AA0060263B}', 2, 12)
+PowerPointLib = None
+if COMTYPES_AVAILABLE:
+    try:
+        PowerPointLib = comtypes.client.GetModule(POWERPOINT_TYPELIB)
+    except Exception as e:
+        logger.warning(f"PowerPoint type library not available, using late-bound COM: {e}")
+
+# Threads used to walk slides within one deck (1 = sequential); python-pptx is mostly pure Python,
+# so this only pays off on large decks where lxml work dominates
+_SLIDE_WORKERS = int(os.getenv("PPT_SLIDE_WORKERS", "1"))
+
+# OOXML namespaces/tags read by the fast text path
+_A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_P_NS = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_R_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_A_P = _A_NS + 'p'
+_A_R = _A_NS + 'r'
+_A_BR = _A_NS + 'br'
+_A_FLD = _A_NS + 'fld'
+_A_T = _A_NS + 't'
+_A_TC = _A_NS + 'tc'
+_A_TR = _A_NS + 'tr'
+_A_TBL = _A_NS + 'tbl'
+
+
+def _create_powerpoint():
+    """Start a PowerPoint.Application, early-bound when the type library was generated"""
+    if PowerPointLib is not None:
+        return comtypes.client.CreateObject("PowerPoint.Application", interface=PowerPointLib._Application)
+    return comtypes.client.CreateObject("PowerPoint.Application")
+
+
+@contextmanager
+def powerpoint_session():
+    """
+    One PowerPoint.Application for several COM extractions (startup takes seconds)
+    Pass the yielded app as `app=` to the extractors; PowerPoint quits when the block exits
+    """
+    app = _create_powerpoint()
+    try:
+        yield app
+    finally:
+        try:
+            app.Quit()
+        except Exception:
+            pass
+
+
+@contextmanager
+def _powerpoint_app(app=None):
+    """Yield the caller's PowerPoint app, or a session of our own for a one-off call"""
+    if app is not None:
+        yield app
+    else:
+        with powerpoint_session() as own_app:
+            yield own_app
+
+
+def _open_com_presentation(app, file_path: str):
+    """Open file_path read-only without a document window (msoTrue = -1, msoFalse = 0)"""
+    return app.Presentations.Open(str(Path(file_path).absolute()), -1, 0, 0)
+
+
+# PowerPoint suffix -> container format: 'pptx' (OOXML zip, read in-process) or 'ppt' (legacy, COM only)
+_PPT_FORMATS = {'.pptx': 'pptx', '.pptm': 'pptx', '.ppt': 'ppt'}
+
+
+def _ppt_suffix(file_path: str) -> str:
+    """Lower-cased suffix of file_path, as Path(file_path).suffix.lower() without building a Path"""
+    name = file_path[max(file_path.rfind('/'), file_path.rfind('\\')) + 1:]
+    dot = name.rfind('.')
+    return name[dot:].lower() if 0 < dot < len(name) - 1 else ''
+
 
 class PPTProcessor:
     """Process PowerPoint files and extract text content"""
@@ -30,8 +133,144 @@ class PPTProcessor:
     @staticmethod
     def is_ppt_file(file_path: str) -> bool:
         """Check if file is a PowerPoint file"""
-        ext = Path(file_path).suffix.lower()
-        return ext in ['.ppt', '.pptx', '.pptm']
+        return _ppt_suffix(file_path) in _PPT_FORMATS
+    
+    @staticmethod
+    def _open_presentation(file_path: str):
+        """
+        Load file_path as a Presentation for one extraction call (not cached: a loaded deck holds
+        every part and media blob; extract_all walks one load for both text and design)
+        """
+        # One sequential read, then the zip directory and every part are inflated from memory
+        # instead of seeking back into the file per part
+        with open(file_path, 'rb') as f:
+            return Presentation(io.BytesIO(f.read()))
+    
+    @staticmethod
+    def _map_slides(worker, *iterables) -> list:
+        """
+        Apply worker across slides, in order
+        Uses PPT_SLIDE_WORKERS threads when set above 1; each slide's shapes are independent
+        """
+        if _SLIDE_WORKERS <= 1:
+            return list(map(worker, *iterables))
+        with ThreadPoolExecutor(max_workers=_SLIDE_WORKERS) as executor:
+            return list(executor.map(worker, *iterables))
+    
+    @staticmethod
+    def _text_result(slide_texts: List[str]) -> Dict[str, any]:
+        """Assemble per-slide texts (in slide order) into the slides_text/total_slides/slide_details result"""
+        # Slide texts are joined from stripped parts, so an empty string is the only blank slide
+        slide_details = [
+            {'slide_number': slide_num, 'text': slide_text}
+            for slide_num, slide_text in enumerate(slide_texts, 1) if slide_text
+        ]
+        
+        return {
+            'slides_text': PPTProcessor._join_slides(slide_details) if slide_details else "[No text content found in slides]",
+            'total_slides': len(slide_texts),
+            'slide_details': slide_details
+        }
+    
+    @staticmethod
+    def _join_slides(slide_details: List[Dict[str, any]]) -> str:
+        """'--- Slide N ---' text for the given slides, built with one join so each slide's text is copied once"""
+        pieces = []
+        for detail in slide_details:
+            pieces.append(f"--- Slide {detail['slide_number']} ---\n")
+            pieces.append(detail['text'])
+            pieces.append("\n\n")
+        return "".join(pieces[:-1])
+    
+    @staticmethod
+    def _slide_part_names(zf: zipfile.ZipFile) -> List[str]:
+        """Slide XML part names in presentation order (from presentation.xml, not file numbering)"""
+        rels = etree.fromstring(zf.read('ppt/_rels/presentation.xml.rels'), _XML_PARSER)
+        targets = {rel.get('Id'): rel.get('Target') for rel in rels}
+        presentation = etree.fromstring(zf.read('ppt/presentation.xml'), _XML_PARSER)
+        part_names = []
+        for sld_id in presentation.iter(_P_NS + 'sldId'):
+            target = targets.get(sld_id.get(_R_NS + 'id'))
+            if target:
+                # Targets are relative to ppt/ unless absolute within the package
+                part_names.append(target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('ppt', target)))
+        return part_names
+    
+    @staticmethod
+    def _paragraph_xml_text(paragraph) -> str:
+        """
+        Text of an a:p element as python-pptx's paragraph.text gives it: runs and fields
+        concatenated, with a vertical tab for each a:br (soft line break)
+        """
+        pieces = []
+        for child in paragraph:
+            if child.tag == _A_R or child.tag == _A_FLD:
+                pieces.append(child.findtext(_A_T) or '')
+            elif child.tag == _A_BR:
+                pieces.append('\v')
+        return ''.join(pieces)
+    
+    @staticmethod
+    def _slide_xml_text(source) -> str:
+        """
+        Text of one slide XML stream, in document order: one line per paragraph,
+        tables as "Table:" followed by one " | "-joined line per row (same layout as _extract_slide_text)
+        """
+        parts = {}  # insertion-ordered set of text parts
+        table_rows = []
+        events = etree.iterparse(source, events=('end',), tag=(_A_P, _A_TR, _A_TBL), **_XML_PARSER_OPTIONS)
+        for _, elem in events:
+            if elem.tag == _A_P:
+                if elem.getparent().getparent().tag == _A_TC:
+                    # Cell paragraphs are read with their row
+                    continue
+                text = PPTProcessor._paragraph_xml_text(elem).strip()
+                if text:
+                    parts[text] = None
+            elif elem.tag == _A_TR:
+                row_text = []
+                for cell in elem.iterchildren(_A_TC):
+                    cell_text = '\n'.join(
+                        PPTProcessor._paragraph_xml_text(paragraph) for paragraph in cell.iter(_A_P)
+                    ).strip()
+                    if cell_text:
+                        row_text.append(cell_text)
+                if row_text:
+                    table_rows.append(" | ".join(row_text))
+            else:
+                if table_rows:
+                    parts["Table:\n" + "\n".join(table_rows)] = None
+                    table_rows = []
+            # Drop the element's content and its already-handled earlier siblings so the
+            # partial tree stays small on text-heavy slides (tail is whitespace between tags)
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        return "\n".join(parts)
+    
+    @staticmethod
+    def extract_text_fast(file_path: str) -> Dict[str, any]:
+        """
+        Extract text from PPTX/PPTM file by streaming the slide XML with lxml
+        Skips building the python-pptx object tree; falls back to extract_text_from_pptx when lxml is missing or the package can't be read this way
+        Returns dict with slides_text, total_slides, and slide_details
+        """
+        if not LXML_AVAILABLE:
+            return PPTProcessor.extract_text_from_pptx(file_path)
+        
+        try:
+            with zipfile.ZipFile(file_path) as zf:
+                slide_texts = []
+                for part_name in PPTProcessor._slide_part_names(zf):
+                    with zf.open(part_name) as source:
+                        slide_texts.append(PPTProcessor._slide_xml_text(source))
+        except Exception as e:
+            logger.warning(f"Fast text extraction failed for {file_path}, falling back to python-pptx: {e}")
+            return PPTProcessor.extract_text_from_pptx(file_path)
+        
+        result = PPTProcessor._text_result(slide_texts)
+        logger.info(f"Extracted text from {len(result['slide_details'])} of {result['total_slides']} slides, total length: {len(result['slides_text'])}")
+        return result
     
     @staticmethod
     def extract_text_from_pptx(file_path: str) -> Dict[str, any]:
@@ -40,8 +279,6 @@ class PPTProcessor:
         Returns dict with slides_text, total_slides, and slide_details
         """
         if not PPTX_AVAILABLE:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error("python-pptx library not available. Cannot process PPTX files.")
             return {
                 'slides_text': '[python-pptx library not available. Install with: pip install python-pptx]',
@@ -50,83 +287,20 @@ class PPTProcessor:
             }
         
         try:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info(f"Attempting to extract text from PPTX file: {file_path}")
             
-            prs = Presentation(file_path)
-            slides_text = []
-            slide_details = []
+            prs = PPTProcessor._open_presentation(file_path)
             
             logger.info(f"Found {len(prs.slides)} slides in presentation")
             
-            for slide_num, slide in enumerate(prs.slides, 1):
-                slide_text_parts = []
-                
-                # Extract text from all shapes in the slide
-                for shape in slide.shapes:
-                    # Try direct text attribute first
-                    if hasattr(shape, "text") and shape.text:
-                        text = shape.text.strip()
-                        if text:
-                            slide_text_parts.append(text)
-                    
-                    # Also try text_frame (for text boxes and placeholders)
-                    if hasattr(shape, "text_frame") and shape.text_frame:
-                        try:
-                            # Get text from text_frame
-                            frame_text = shape.text_frame.text.strip()
-                            if frame_text and frame_text not in slide_text_parts:
-                                slide_text_parts.append(frame_text)
-                            
-                            # Also check paragraphs in text_frame
-                            for paragraph in shape.text_frame.paragraphs:
-                                para_text = paragraph.text.strip()
-                                if para_text and para_text not in slide_text_parts:
-                                    slide_text_parts.append(para_text)
-                        except Exception:
-                            pass
-                    
-                    # Also check for tables
-                    if hasattr(shape, "has_table") and shape.has_table:
-                        try:
-                            table_text = []
-                            for row in shape.table.rows:
-                                row_text = []
-                                for cell in row.cells:
-                                    cell_text = cell.text.strip() if cell.text else ""
-                                    if cell_text:
-                                        row_text.append(cell_text)
-                                if row_text:
-                                    table_text.append(" | ".join(row_text))
-                            if table_text:
-                                slide_text_parts.append("Table:\n" + "\n".join(table_text))
-                        except Exception:
-                            pass
-                
-                slide_text = "\n".join(slide_text_parts)
-                
-                if slide_text.strip():
-                    slide_details.append({
-                        'slide_number': slide_num,
-                        'text': slide_text
-                    })
-                    slides_text.append(f"--- Slide {slide_num} ---\n{slide_text}")
+            slides = list(prs.slides)
+            result = PPTProcessor._text_result(PPTProcessor._map_slides(PPTProcessor._extract_slide_text, slides))
             
-            total_slides = len(prs.slides)
-            combined_text = "\n\n".join(slides_text) if slides_text else "[No text content found in slides]"
+            logger.info(f"Extracted text from {len(result['slide_details'])} slides, total length: {len(result['slides_text'])}")
             
-            logger.info(f"Extracted text from {len(slide_details)} slides, total length: {len(combined_text)}")
-            
-            return {
-                'slides_text': combined_text,
-                'total_slides': total_slides,
-                'slide_details': slide_details
-            }
+            return result
             
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"Error reading PPTX file {file_path}: {e}", exc_info=True)
             return {
                 'slides_text': f'[Error reading PPTX file: {str(e)}]',
@@ -135,9 +309,10 @@ class PPTProcessor:
             }
     
     @staticmethod
-    def extract_text_from_ppt(file_path: str) -> Dict[str, any]:
+    def extract_text_from_ppt(file_path: str, app=None) -> Dict[str, any]:
         """
         Extract text from legacy PPT file using COM automation (Windows only)
+        app: PowerPoint from powerpoint_session() to reuse; a new one is started when omitted
         Returns dict with slides_text, total_slides, and slide_details
         """
         if not COMTYPES_AVAILABLE:
@@ -148,59 +323,38 @@ class PPTProcessor:
             }
         
         try:
-            powerpoint = comtypes.client.CreateObject("PowerPoint.Application")
-            powerpoint.Visible = 1
-            
-            try:
-                presentation = powerpoint.Presentations.Open(str(Path(file_path).absolute()))
-                slides_text = []
-                slide_details = []
-                
-                total_slides = presentation.Slides.Count
-                
-                for slide_num in range(1, total_slides + 1):
-                    slide = presentation.Slides(slide_num)
-                    slide_text_parts = []
+            with _powerpoint_app(app) as powerpoint:
+                try:
+                    presentation = _open_com_presentation(powerpoint, file_path)
+                    slide_texts = []
                     
-                    # Extract text from all shapes
-                    for shape_num in range(1, slide.Shapes.Count + 1):
-                        shape = slide.Shapes(shape_num)
-                        if hasattr(shape, "TextFrame") and shape.TextFrame:
-                            if hasattr(shape.TextFrame, "TextRange") and shape.TextFrame.TextRange:
-                                text = shape.TextFrame.TextRange.Text.strip()
-                                if text:
-                                    slide_text_parts.append(text)
+                    total_slides = presentation.Slides.Count
                     
-                    slide_text = "\n".join(slide_text_parts)
+                    for slide_num in range(1, total_slides + 1):
+                        slide = presentation.Slides(slide_num)
+                        slide_text_parts = []
+                        
+                        # Extract text from all shapes
+                        for shape_num in range(1, slide.Shapes.Count + 1):
+                            shape = slide.Shapes(shape_num)
+                            if hasattr(shape, "TextFrame") and shape.TextFrame:
+                                if hasattr(shape.TextFrame, "TextRange") and shape.TextFrame.TextRange:
+                                    text = shape.TextFrame.TextRange.Text.strip()
+                                    if text:
+                                        slide_text_parts.append(text)
+                        
+                        slide_texts.append("\n".join(slide_text_parts))
                     
-                    if slide_text.strip():
-                        slide_details.append({
-                            'slide_number': slide_num,
-                            'text': slide_text
-                        })
-                        slides_text.append(f"--- Slide {slide_num} ---\n{slide_text}")
-                
-                combined_text = "\n\n".join(slides_text) if slides_text else "[No text content found in slides]"
-                
-                presentation.Close()
-                powerpoint.Quit()
-                
-                return {
-                    'slides_text': combined_text,
-                    'total_slides': total_slides,
-                    'slide_details': slide_details
-                }
-                
-            except Exception as e:
-                try:
-                    powerpoint.Quit()
-                except:
-                    pass
-                return {
-                    'slides_text': f'[Error reading PPT file: {str(e)}]',
-                    'total_slides': 0,
-                    'slide_details': []
-                }
+                    presentation.Close()
+                    
+                    return PPTProcessor._text_result(slide_texts)
+                    
+                except Exception as e:
+                    return {
+                        'slides_text': f'[Error reading PPT file: {str(e)}]',
+                        'total_slides': 0,
+                        'slide_details': []
+                    }
                 
         except Exception as e:
             return {
@@ -210,17 +364,19 @@ class PPTProcessor:
             }
     
     @staticmethod
-    def process_ppt_file(file_path: str) -> Dict[str, any]:
+    def process_ppt_file(file_path: str, app=None) -> Dict[str, any]:
         """
         Process a PowerPoint file and extract text content
+        app: optional PowerPoint session, used for legacy .ppt files
         Returns dict with slides_text, total_slides, and slide_details
         """
-        ext = Path(file_path).suffix.lower()
+        ext = _ppt_suffix(file_path)
+        ppt_format = _PPT_FORMATS.get(ext)
         
-        if ext == '.pptx' or ext == '.pptm':
-            return PPTProcessor.extract_text_from_pptx(file_path)
-        elif ext == '.ppt':
-            return PPTProcessor.extract_text_from_ppt(file_path)
+        if ppt_format == 'pptx':
+            return PPTProcessor.extract_text_fast(file_path)
+        elif ppt_format == 'ppt':
+            return PPTProcessor.extract_text_from_ppt(file_path, app)
         else:
             return {
                 'slides_text': f'[Unsupported PowerPoint format: {ext}]',
@@ -229,150 +385,346 @@ class PPTProcessor:
             }
     
     @staticmethod
-    def convert_slides_to_images_pptx(file_path: str) -> List[str]:
-        """
-        Convert PPTX slides to base64-encoded PNG images
-        Returns list of base64 strings (one per slide)
-        """
-        if not PPTX_AVAILABLE:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error("python-pptx library not available. Cannot convert slides to images.")
-            return []
-        
+    def _read_png_base64(image_path: str) -> str:
+        """Read an exported slide PNG, delete it, and return it base64-encoded"""
+        # O_SEQUENTIAL (Windows only) hints the cache manager to read ahead for a single front-to-back pass
+        fd = os.open(image_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0) | getattr(os, 'O_SEQUENTIAL', 0))
+        with os.fdopen(fd, "rb") as img_file:
+            img_data = img_file.read()
+        # Drop the file as soon as it's encoded so the temp dir never holds the whole deck
         try:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Converting PPTX slides to images: {file_path}")
-            
-            prs = Presentation(file_path)
-            slide_images = []
-            
-            # Try to use COM automation on Windows to export slides as images
-            if COMTYPES_AVAILABLE:
+            os.remove(image_path)
+        except OSError:
+            pass
+        # Base64 output is pure ASCII, so the ASCII decoder's fast path applies
+        return base64.b64encode(img_data).decode('ascii')
+    
+    @staticmethod
+    def _export_slide_images(file_path: str, app=None) -> List[str]:
+        """Export every slide of file_path through PowerPoint as base64-encoded PNGs (raises on COM errors)"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            with _powerpoint_app(app) as powerpoint:
+                presentation = _open_com_presentation(powerpoint, file_path)
                 try:
-                    import tempfile
-                    import os
-                    temp_dir = tempfile.mkdtemp()
-                    
-                    powerpoint = comtypes.client.CreateObject("PowerPoint.Application")
-                    powerpoint.Visible = 0  # Don't show PowerPoint
-                    
-                    try:
-                        presentation = powerpoint.Presentations.Open(str(Path(file_path).absolute()))
-                        
-                        for slide_num in range(1, len(prs.slides) + 1):
+                    # COM export stays on this thread (PowerPoint is single-threaded);
+                    # reading + base64 of slide N overlaps the export of slide N+1
+                    with ThreadPoolExecutor(max_workers=4) as encoder:
+                        futures = []
+                        for slide_num in range(1, presentation.Slides.Count + 1):
                             slide = presentation.Slides(slide_num)
                             image_path = os.path.join(temp_dir, f"slide_{slide_num}.png")
                             
                             # Export slide as PNG
                             slide.Export(image_path, "PNG", 1920, 1080)  # High resolution
-                            
-                            # Read image and convert to base64
-                            with open(image_path, "rb") as img_file:
-                                img_data = img_file.read()
-                                img_base64 = base64.b64encode(img_data).decode('utf-8')
-                                slide_images.append(img_base64)
-                        
-                        presentation.Close()
-                        powerpoint.Quit()
-                        
-                        # Cleanup temp directory
-                        import shutil
-                        shutil.rmtree(temp_dir, ignore_errors=True)
+                            futures.append(encoder.submit(PPTProcessor._read_png_base64, image_path))
                         
-                        logger.info(f"Successfully converted {len(slide_images)} slides to images")
-                        return slide_images
-                        
-                    except Exception as e:
-                        try:
-                            powerpoint.Quit()
-                        except:
-                            pass
-                        import shutil
-                        shutil.rmtree(temp_dir, ignore_errors=True)
-                        logger.warning(f"COM automation failed, trying alternative method: {e}")
-                except Exception as e:
-                    logger.warning(f"COM automation not available or failed: {e}")
-            
-            # Fallback: Try using python-pptx with PIL (limited - won't render properly)
-            # This is a placeholder - actual rendering requires Office automation or conversion service
-            logger.warning("Direct slide rendering not available. COM automation required for image conversion.")
-            return []
-            
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error converting slides to images: {e}", exc_info=True)
+                        return [future.result() for future in futures]
+                finally:
+                    presentation.Close()
+        finally:
+            # Cleanup temp directory
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    @staticmethod
+    def convert_slides_to_images_pptx(file_path: str, app=None) -> List[str]:
+        """
+        Convert PPTX slides to base64-encoded PNG images
+        app: PowerPoint from powerpoint_session() to reuse; a new one is started when omitted
+        Returns list of base64 strings (one per slide)
+        """
+        if not PPTX_AVAILABLE:
+            logger.error("python-pptx library not available. Cannot convert slides to images.")
             return []
+        
+        logger.info(f"Converting PPTX slides to images: {file_path}")
+        
+        # Try to use COM automation on Windows to export slides as images
+        if COMTYPES_AVAILABLE:
+            try:
+                slide_images = PPTProcessor._export_slide_images(file_path, app)
+                logger.info(f"Successfully converted {len(slide_images)} slides to images")
+                return slide_images
+            except Exception as e:
+                logger.warning(f"COM automation failed, trying alternative method: {e}")
+        
+        # Fallback: Try using python-pptx with PIL (limited - won't render properly)
+        # This is a placeholder - actual rendering requires Office automation or conversion service
+        logger.warning("Direct slide rendering not available. COM automation required for image conversion.")
+        return []
     
     @staticmethod
-    def convert_slides_to_images(file_path: str) -> List[str]:
+    def convert_slides_to_images(file_path: str, app=None) -> List[str]:
         """
         Convert PowerPoint slides to base64-encoded PNG images
+        app: optional PowerPoint session to reuse for the COM export
         Returns list of base64 strings (one per slide)
         """
-        ext = Path(file_path).suffix.lower()
+        ext = _ppt_suffix(file_path)
+        ppt_format = _PPT_FORMATS.get(ext)
         
-        if ext == '.pptx' or ext == '.pptm':
-            return PPTProcessor.convert_slides_to_images_pptx(file_path)
-        elif ext == '.ppt':
+        if ppt_format == 'pptx':
+            return PPTProcessor.convert_slides_to_images_pptx(file_path, app)
+        elif ppt_format == 'ppt':
             # For legacy PPT, use COM automation
             if COMTYPES_AVAILABLE:
                 try:
-                    import logging
-                    import tempfile
-                    import os
-                    import base64
-                    logger = logging.getLogger(__name__)
-                    
-                    temp_dir = tempfile.mkdtemp()
-                    slide_images = []
-                    
-                    powerpoint = comtypes.client.CreateObject("PowerPoint.Application")
-                    powerpoint.Visible = 0
-                    
-                    try:
-                        presentation = powerpoint.Presentations.Open(str(Path(file_path).absolute()))
-                        total_slides = presentation.Slides.Count
-                        
-                        for slide_num in range(1, total_slides + 1):
-                            slide = presentation.Slides(slide_num)
-                            image_path = os.path.join(temp_dir, f"slide_{slide_num}.png")
-                            
-                            slide.Export(image_path, "PNG", 1920, 1080)
-                            
-                            with open(image_path, "rb") as img_file:
-                                img_data = img_file.read()
-                                img_base64 = base64.b64encode(img_data).decode('utf-8')
-                                slide_images.append(img_base64)
-                        
-                        presentation.Close()
-                        powerpoint.Quit()
-                        
-                        import shutil
-                        shutil.rmtree(temp_dir, ignore_errors=True)
-                        
-                        return slide_images
-                    except Exception as e:
-                        try:
-                            powerpoint.Quit()
-                        except:
-                            pass
-                        import shutil
-                        shutil.rmtree(temp_dir, ignore_errors=True)
-                        logger.error(f"Error converting PPT slides: {e}")
-                        return []
+                    return PPTProcessor._export_slide_images(file_path, app)
                 except Exception as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Error with COM automation: {e}")
+                    logger.error(f"Error converting PPT slides: {e}")
                     return []
             else:
                 return []
         else:
             return []
     
+    @staticmethod
+    def _shape_text_parts(shape, text_candidates: list) -> None:
+        """Append a shape's text parts (paragraphs, then a "Table:" block) to text_candidates, descending into groups"""
+        if hasattr(shape, "shapes"):
+            # Group shape: its children carry the text, in document order (as the fast path reads them)
+            for child in shape.shapes:
+                PPTProcessor._shape_text_parts(child, text_candidates)
+            return
+        
+        if getattr(shape, "has_text_frame", False):
+            # Text boxes and placeholders: shape.text and text_frame.text are just the paragraphs
+            # joined, so walk the paragraphs once instead of reading the same XML three times
+            try:
+                text_candidates.extend(paragraph.text.strip() for paragraph in shape.text_frame.paragraphs)
+            except Exception:
+                pass
+        else:
+            shape_text = getattr(shape, "text", "")
+            if shape_text:
+                text_candidates.append(shape_text.strip())
+        
+        # Also check for tables
+        if hasattr(shape, "has_table") and shape.has_table:
+            try:
+                table_text = []
+                for row in shape.table.rows:
+                    row_text = []
+                    for cell in row.cells:
+                        cell_text = cell.text.strip() if cell.text else ""
+                        if cell_text:
+                            row_text.append(cell_text)
+                    if row_text:
+                        table_text.append(" | ".join(row_text))
+                if table_text:
+                    text_candidates.append("Table:\n" + "\n".join(table_text))
+            except Exception:
+                pass
+    
+    @staticmethod
+    def _walk_slide(slide_num: int, slide, with_text: bool = True, with_design: bool = True) -> tuple:
+        """
+        Extract text and/or design details from one slide in a single pass over its shapes
+        Returns (slide_text or None, (slide_design, slide_desc) or None)
+        """
+        # Raw text parts in slide order; duplicates are dropped when the slide text is joined
+        text_candidates = []
+        
+        if with_design:
+            slide_design = {
+                'slide_number': slide_num,
+                'background': {},
+                'shapes': [],
+                'fonts': [],
+                'colors': [],
+                'layout_info': {}
+            }
+        
+            # Extract background information
+            try:
+                if hasattr(slide, 'background') and slide.background:
+                    if hasattr(slide.background, 'fill'):
+                        fill = slide.background.fill
+                        bg_info = {}
+                        if hasattr(fill, 'type'):
+                            bg_info['type'] = str(fill.type)
+                        if hasattr(fill, 'fore_color') and fill.fore_color:
+                            if hasattr(fill.fore_color, 'rgb'):
+                                bg_info['color'] = str(fill.fore_color.rgb)
+                        if bg_info:
+                            slide_design['background'] = bg_info
+            except Exception:
+                pass
+        
+            # Sidecar sets for the fonts/colors lists so dedupe checks are O(1)
+            font_names_seen = set()
+            colors_seen = set()
+        
+            # Extract information from shapes
+            shape_count = 0
+            text_shapes = 0
+            image_shapes = 0
+            table_shapes = 0
+            auto_shapes = 0
+        
+        for shape in slide.shapes:
+            if with_text:
+                PPTProcessor._shape_text_parts(shape, text_candidates)
+            
+            if with_design:
+                shape_count += 1
+                shape_info = {
+                    'type': type(shape).__name__,
+                    'position': {},
+                    'size': {},
+                    'formatting': {}
+                }
+            
+                # Get position and size (every shape has these; access directly instead of probing with hasattr)
+                try:
+                    shape_info['position']['left'] = shape.left
+                    shape_info['position']['top'] = shape.top
+                    shape_info['size']['width'] = shape.width
+                    shape_info['size']['height'] = shape.height
+                except Exception:
+                    pass
+            
+                # Check shape type (one shape_type read instead of probing image/has_table/auto_shape_type)
+                try:
+                    try:
+                        shape_type = shape.shape_type
+                    except Exception:
+                        shape_type = None
+                    probed = shape_type in _PROBED_SHAPE_TYPES
+                    if shape_type in _PICTURE_SHAPE_TYPES or (probed and hasattr(shape, 'image')):
+                        image_shapes += 1
+                        shape_info['has_image'] = True
+                    elif shape_type == MSO_SHAPE_TYPE.TABLE or (probed and getattr(shape, 'has_table', False)):
+                        table_shapes += 1
+                        shape_info['has_table'] = True
+                    elif shape_type in _AUTO_SHAPE_TYPES or (probed and hasattr(shape, 'auto_shape_type')):
+                        # Try to access auto_shape_type - it raises ValueError if not an auto shape
+                        try:
+                            auto_type = shape.auto_shape_type
+                            auto_shapes += 1
+                            shape_info['auto_shape_type'] = str(auto_type)
+                        except ValueError:
+                            # Not an auto shape, skip
+                            pass
+                except Exception:
+                    # Skip shape type detection if there's any error
+                    pass
+            
+                # Extract text formatting
+                try:
+                    if hasattr(shape, 'text_frame') and shape.text_frame:
+                        text_shapes += 1
+                        # Get font information from paragraphs
+                        for paragraph in shape.text_frame.paragraphs:
+                            # paragraph.font builds a new Font proxy on every access, so read it once
+                            try:
+                                font = paragraph.font
+                                font_info = {
+                                    'name': font.name,
+                                    'size': font.size,
+                                    'bold': font.bold,
+                                    'italic': font.italic
+                                }
+                            except AttributeError:
+                                continue
+                            # Theme and unset colors have no .rgb
+                            try:
+                                font_info['color'] = str(font.color.rgb)
+                            except AttributeError:
+                                pass
+                            shape_info['formatting']['font'] = font_info
+                            if (name := font_info['name']) and name not in font_names_seen:
+                                font_names_seen.add(name)
+                                slide_design['fonts'].append(font_info)
+                            if (color := font_info.get('color')) and color not in colors_seen:
+                                colors_seen.add(color)
+                                slide_design['colors'].append(color)
+                except Exception:
+                    pass
+            
+                # Extract fill colors (shapes without a fill, non-solid fills and theme colors raise and are skipped)
+                try:
+                    color = str(shape.fill.fore_color.rgb)
+                    if color not in colors_seen:
+                        colors_seen.add(color)
+                        slide_design['colors'].append(color)
+                except Exception:
+                    pass
+            
+                # Extract line colors
+                try:
+                    color = str(shape.line.color.rgb)
+                    if color not in colors_seen:
+                        colors_seen.add(color)
+                        slide_design['colors'].append(color)
+                except Exception:
+                    pass
+            
+                slide_design['shapes'].append(shape_info)
+        
+        # Skip empty parts; dict.fromkeys dedupes in C while keeping first-seen order
+        slide_text = "\n".join(dict.fromkeys(part for part in text_candidates if part)) if with_text else None
+        if not with_design:
+            return slide_text, None
+        
+        # Layout information
+        slide_design['layout_info'] = {
+            'total_shapes': shape_count,
+            'text_shapes': text_shapes,
+            'image_shapes': image_shapes,
+            'table_shapes': table_shapes,
+            'auto_shapes': auto_shapes
+        }
+        
+        # Build text description for this slide
+        slide_desc = [f"=== Slide {slide_num} Design ==="]
+        
+        if slide_design['background']:
+            slide_desc.append(f"Background: {slide_design['background']}")
+        
+        slide_desc.append(f"Layout: {shape_count} shapes ({text_shapes} text, {image_shapes} images, {table_shapes} tables, {auto_shapes} auto-shapes)")
+        
+        if slide_design['fonts']:
+            unique_fonts = {}
+            for font in slide_design['fonts']:
+                name = font.get('name', 'Unknown')
+                if name not in unique_fonts:
+                    unique_fonts[name] = font
+            font_list = [f"{f.get('name')} (size: {f.get('size')}, bold: {f.get('bold')}, italic: {f.get('italic')})" 
+                        for f in unique_fonts.values()]
+            slide_desc.append(f"Typography: {', '.join(font_list)}")
+        
+        if slide_design['colors']:
+            slide_desc.append(f"Colors used: {', '.join(slide_design['colors'])}")
+        
+        # Shape positioning analysis
+        if slide_design['shapes']:
+            positions = [s.get('position', {}) for s in slide_design['shapes']]
+            sizes = [s.get('size', {}) for s in slide_design['shapes']]
+            slide_desc.append(f"Shape positioning: {len(positions)} positioned elements")
+        
+        return slide_text, (slide_design, "\n".join(slide_desc))
+    
+    @staticmethod
+    def _extract_slide_text(slide) -> str:
+        """Text from one slide's shapes and tables, one part per line"""
+        return PPTProcessor._walk_slide(0, slide, with_design=False)[0]
+    
+    @staticmethod
+    def _extract_slide_design(slide_num: int, slide) -> tuple:
+        """Design details dict and text description for one slide"""
+        return PPTProcessor._walk_slide(slide_num, slide, with_text=False)[1]
+    
+    @staticmethod
+    def _design_result(slide_designs: List[tuple]) -> Dict[str, any]:
+        """Assemble per-slide (slide_design, slide_desc) pairs into the design_description/total_slides/design_details result"""
+        design_parts = [slide_desc for _, slide_desc in slide_designs]
+        return {
+            'design_description': "\n\n".join(design_parts) if design_parts else "[No design information found]",
+            'total_slides': len(slide_designs),
+            'design_details': [slide_design for slide_design, _ in slide_designs]
+        }
+    
     @staticmethod
     def extract_design_metadata_pptx(file_path: str) -> Dict[str, any]:
         """
@@ -380,8 +732,6 @@ class PPTProcessor:
         Returns dict with design_description, total_slides, and design_details
         """
         if not PPTX_AVAILABLE:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error("python-pptx library not available. Cannot extract design metadata.")
             return {
                 'design_description': '[python-pptx library not available. Install with: pip install python-pptx]',
@@ -390,13 +740,9 @@ class PPTProcessor:
             }
         
         try:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info(f"Extracting design metadata from PPTX file: {file_path}")
             
-            prs = Presentation(file_path)
-            design_details = []
-            design_parts = []
+            prs = PPTProcessor._open_presentation(file_path)
             
             # Extract theme colors if available
             theme_colors = []
@@ -410,198 +756,62 @@ class PPTProcessor:
                 pass
             
             # Analyze each slide
-            for slide_num, slide in enumerate(prs.slides, 1):
-                slide_design = {
-                    'slide_number': slide_num,
-                    'background': {},
-                    'shapes': [],
-                    'fonts': [],
-                    'colors': [],
-                    'layout_info': {}
-                }
-                
-                # Extract background information
-                try:
-                    if hasattr(slide, 'background') and slide.background:
-                        if hasattr(slide.background, 'fill'):
-                            fill = slide.background.fill
-                            bg_info = {}
-                            if hasattr(fill, 'type'):
-                                bg_info['type'] = str(fill.type)
-                            if hasattr(fill, 'fore_color') and fill.fore_color:
-                                if hasattr(fill.fore_color, 'rgb'):
-                                    bg_info['color'] = str(fill.fore_color.rgb)
-                            if bg_info:
-                                slide_design['background'] = bg_info
-                except Exception:
-                    pass
-                
-                # Extract information from shapes
-                shape_count = 0
-                text_shapes = 0
-                image_shapes = 0
-                table_shapes = 0
-                auto_shapes = 0
-                
-                for shape in slide.shapes:
-                    shape_count += 1
-                    shape_info = {
-                        'type': type(shape).__name__,
-                        'position': {},
-                        'size': {},
-                        'formatting': {}
-                    }
-                    
-                    # Get position and size
-                    try:
-                        if hasattr(shape, 'left'):
-                            shape_info['position']['left'] = shape.left
-                        if hasattr(shape, 'top'):
-                            shape_info['position']['top'] = shape.top
-                        if hasattr(shape, 'width'):
-                            shape_info['size']['width'] = shape.width
-                        if hasattr(shape, 'height'):
-                            shape_info['size']['height'] = shape.height
-                    except Exception:
-                        pass
-                    
-                    # Check shape type
-                    try:
-                        if hasattr(shape, 'image'):
-                            image_shapes += 1
-                            shape_info['has_image'] = True
-                        elif hasattr(shape, 'has_table') and shape.has_table:
-                            table_shapes += 1
-                            shape_info['has_table'] = True
-                        elif hasattr(shape, 'auto_shape_type'):
-                            # Try to access auto_shape_type - it raises ValueError if not an auto shape
-                            try:
-                                auto_type = shape.auto_shape_type
-                                auto_shapes += 1
-                                shape_info['auto_shape_type'] = str(auto_type)
-                            except ValueError:
-                                # Not an auto shape, skip
-                                pass
-                    except Exception:
-                        # Skip shape type detection if there's any error
-                        pass
-                    
-                    # Extract text formatting
-                    try:
-                        if hasattr(shape, 'text_frame') and shape.text_frame:
-                            text_shapes += 1
-                            # Get font information from paragraphs
-                            for paragraph in shape.text_frame.paragraphs:
-                                if hasattr(paragraph, 'font') and paragraph.font:
-                                    font_info = {}
-                                    if hasattr(paragraph.font, 'name'):
-                                        font_info['name'] = paragraph.font.name
-                                    if hasattr(paragraph.font, 'size'):
-                                        font_info['size'] = paragraph.font.size
-                                    if hasattr(paragraph.font, 'bold'):
-                                        font_info['bold'] = paragraph.font.bold
-                                    if hasattr(paragraph.font, 'italic'):
-                                        font_info['italic'] = paragraph.font.italic
-                                    if hasattr(paragraph.font, 'color') and paragraph.font.color:
-                                        if hasattr(paragraph.font.color, 'rgb'):
-                                            font_info['color'] = str(paragraph.font.color.rgb)
-                                    if font_info:
-                                        shape_info['formatting']['font'] = font_info
-                                        if font_info.get('name'):
-                                            if font_info['name'] not in [f.get('name') for f in slide_design['fonts']]:
-                                                slide_design['fonts'].append(font_info)
-                                        if font_info.get('color'):
-                                            if font_info['color'] not in slide_design['colors']:
-                                                slide_design['colors'].append(font_info['color'])
-                    except Exception:
-                        pass
-                    
-                    # Extract fill colors
-                    try:
-                        if hasattr(shape, 'fill'):
-                            fill = shape.fill
-                            if hasattr(fill, 'fore_color') and fill.fore_color:
-                                if hasattr(fill.fore_color, 'rgb'):
-                                    color = str(fill.fore_color.rgb)
-                                    if color not in slide_design['colors']:
-                                        slide_design['colors'].append(color)
-                    except Exception:
-                        pass
-                    
-                    # Extract line colors
-                    try:
-                        if hasattr(shape, 'line'):
-                            line = shape.line
-                            if hasattr(line, 'color') and line.color:
-                                if hasattr(line.color, 'rgb'):
-                                    color = str(line.color.rgb)
-                                    if color not in slide_design['colors']:
-                                        slide_design['colors'].append(color)
-                    except Exception:
-                        pass
-                    
-                    slide_design['shapes'].append(shape_info)
-                
-                # Layout information
-                slide_design['layout_info'] = {
-                    'total_shapes': shape_count,
-                    'text_shapes': text_shapes,
-                    'image_shapes': image_shapes,
-                    'table_shapes': table_shapes,
-                    'auto_shapes': auto_shapes
-                }
-                
-                design_details.append(slide_design)
-                
-                # Build text description for this slide
-                slide_desc = [f"=== Slide {slide_num} Design ==="]
-                
-                if slide_design['background']:
-                    slide_desc.append(f"Background: {slide_design['background']}")
-                
-                slide_desc.append(f"Layout: {shape_count} shapes ({text_shapes} text, {image_shapes} images, {table_shapes} tables, {auto_shapes} auto-shapes)")
-                
-                if slide_design['fonts']:
-                    unique_fonts = {}
-                    for font in slide_design['fonts']:
-                        name = font.get('name', 'Unknown')
-                        if name not in unique_fonts:
-                            unique_fonts[name] = font
-                    font_list = [f"{f.get('name')} (size: {f.get('size')}, bold: {f.get('bold')}, italic: {f.get('italic')})" 
-                                for f in unique_fonts.values()]
-                    slide_desc.append(f"Typography: {', '.join(font_list)}")
-                
-                if slide_design['colors']:
-                    slide_desc.append(f"Colors used: {', '.join(slide_design['colors'])}")
-                
-                # Shape positioning analysis
-                if slide_design['shapes']:
-                    positions = [s.get('position', {}) for s in slide_design['shapes']]
-                    sizes = [s.get('size', {}) for s in slide_design['shapes']]
-                    slide_desc.append(f"Shape positioning: {len(positions)} positioned elements")
-                
-                design_parts.append("\n".join(slide_desc))
+            slides = list(prs.slides)
+            result = PPTProcessor._design_result(PPTProcessor._map_slides(
+                PPTProcessor._extract_slide_design, range(1, len(slides) + 1), slides
+            ))
             
-            total_slides = len(prs.slides)
-            combined_description = "\n\n".join(design_parts) if design_parts else "[No design information found]"
+            logger.info(f"Extracted design metadata from {len(result['design_details'])} slides")
             
-            logger.info(f"Extracted design metadata from {len(design_details)} slides")
+            return result
             
+        except Exception as e:
+            logger.error(f"Error extracting design metadata from PPTX file {file_path}: {e}", exc_info=True)
             return {
-                'design_description': combined_description,
-                'total_slides': total_slides,
-                'design_details': design_details
+                'design_description': f'[Error extracting design metadata: {str(e)}]',
+                'total_slides': 0,
+                'design_details': []
             }
-            
+    
+    @staticmethod
+    def extract_all_pptx(file_path: str) -> Tuple[Dict[str, any], Dict[str, any]]:
+        """
+        Extract text content and design metadata from a PPTX/PPTM file in one walk over the slides
+        Returns (text result like extract_text_from_pptx, design result like extract_design_metadata_pptx)
+        """
+        if not PPTX_AVAILABLE:
+            return PPTProcessor.extract_text_from_pptx(file_path), PPTProcessor.extract_design_metadata_pptx(file_path)
+        
+        try:
+            prs = PPTProcessor._open_presentation(file_path)
+            slides = list(prs.slides)
+            walked = PPTProcessor._map_slides(PPTProcessor._walk_slide, range(1, len(slides) + 1), slides)
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error extracting design metadata from PPTX file {file_path}: {e}", exc_info=True)
+            logger.error(f"Error reading PPTX file {file_path}: {e}", exc_info=True)
             return {
+                'slides_text': f'[Error reading PPTX file: {str(e)}]',
+                'total_slides': 0,
+                'slide_details': []
+            }, {
                 'design_description': f'[Error extracting design metadata: {str(e)}]',
                 'total_slides': 0,
                 'design_details': []
             }
+        
+        text_result = PPTProcessor._text_result([slide_text for slide_text, _ in walked])
+        design_result = PPTProcessor._design_result([slide_design for _, slide_design in walked])
+        logger.info(f"Extracted text and design metadata from {len(walked)} slides in one pass")
+        return text_result, design_result
+    
+    @staticmethod
+    def extract_all(file_path: str) -> Tuple[Dict[str, any], Dict[str, any]]:
+        """
+        Extract text content and design metadata from a PowerPoint file
+        Returns (process_ppt_file result, extract_design_metadata result); PPTX files are walked once for both
+        """
+        if _PPT_FORMATS.get(_ppt_suffix(file_path)) == 'pptx':
+            return PPTProcessor.extract_all_pptx(file_path)
+        return PPTProcessor.process_ppt_file(file_path), PPTProcessor.extract_design_metadata(file_path)
     
     @staticmethod
     def extract_design_metadata(file_path: str) -> Dict[str, any]:
@@ -609,11 +819,12 @@ class PPTProcessor:
         Extract design metadata from PowerPoint file
         Returns dict with design_description, total_slides, and design_details
         """
-        ext = Path(file_path).suffix.lower()
+        ext = _ppt_suffix(file_path)
+        ppt_format = _PPT_FORMATS.get(ext)
         
-        if ext == '.pptx' or ext == '.pptm':
+        if ppt_format == 'pptx':
             return PPTProcessor.extract_design_metadata_pptx(file_path)
-        elif ext == '.ppt':
+        elif ppt_format == 'ppt':
             # For legacy PPT files, we can't extract design metadata without PowerPoint
             return {
                 'design_description': '[Legacy PPT format (.ppt) requires PowerPoint installation for design metadata extraction. Please use PPTX format for design evaluation without PowerPoint.]',
@@ -628,16 +839,46 @@ class PPTProcessor:
             }
     
     @staticmethod
-    def process_multiple_ppt_files(file_paths: List[str]) -> List[Dict[str, any]]:
+    def process_multiple_ppt_files(file_paths: List[str], max_workers: Optional[int] = None) -> List[Dict[str, any]]:
         """
-        Process multiple PPT files
+        Process multiple PPT files, results in input order
+        PPTX/PPTM files run in parallel worker processes (max_workers defaults to the CPU count);
+        legacy PPT files run one after another in a single shared PowerPoint session
         Returns list of dicts, each containing slides_text, total_slides, and slide_details
         """
+        extracted = [None] * len(file_paths)
+        buckets = {'pptx': [], 'ppt': [], None: []}
+        for index, file_path in enumerate(file_paths):
+            buckets[_PPT_FORMATS.get(_ppt_suffix(file_path))].append(index)
+        
+        pptx_paths = [file_paths[index] for index in buckets['pptx']]
+        if len(pptx_paths) <= 1:
+            pptx_results = [PPTProcessor.process_ppt_file(file_path) for file_path in pptx_paths]
+        else:
+            # Extraction is CPU-bound lxml work; processes sidestep the GIL that threads would share
+            workers = min(max_workers or os.cpu_count() or 1, len(pptx_paths))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pptx_results = list(executor.map(PPTProcessor.process_ppt_file, pptx_paths))
+        for index, result in zip(buckets['pptx'], pptx_results):
+            extracted[index] = result
+        
+        if len(buckets['ppt']) > 1 and COMTYPES_AVAILABLE:
+            # PowerPoint takes seconds to start, so launch it once for every legacy file
+            try:
+                with powerpoint_session() as app:
+                    for index in buckets['ppt']:
+                        extracted[index] = PPTProcessor.extract_text_from_ppt(file_paths[index], app)
+            except Exception as e:
+                logger.warning(f"Shared PowerPoint session failed, processing PPT files individually: {e}")
+        
+        # Single legacy files, files the shared session didn't reach, and unsupported formats
+        for index in buckets['ppt'] + buckets[None]:
+            if extracted[index] is None:
+                extracted[index] = PPTProcessor.process_ppt_file(file_paths[index])
+        
         results = []
-        for file_path in file_paths:
-            result = PPTProcessor.process_ppt_file(file_path)
+        for file_path, result in zip(file_paths, extracted):
             result['file_path'] = file_path
             result['filename'] = Path(file_path).name
             results.append(result)
         return results
-
@@ -0,0 +1,40 @@
+"""
+Result Cache - In-memory LRU cache for LLM evaluation results keyed by content hash
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class ResultCache:
+    """Bounded LRU map from a content hash to an evaluation result"""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Hash the given strings into a cache key (length-prefixed so part boundaries matter)"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            data = str(part or '').encode('utf-8', errors='replace')
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        # Callers annotate results (filename etc.), so hand out a copy
+        return dict(entry)
+
+    def put(self, key: str, result: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = dict(result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)